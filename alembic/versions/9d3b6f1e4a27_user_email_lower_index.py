@@ -0,0 +1,28 @@
+"""User email lower index
+
+Revision ID: 9d3b6f1e4a27
+Revises: e5a7d2c9f013
+Create Date: 2026-10-18 18:42:51.207413
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3b6f1e4a27'
+down_revision = 'e5a7d2c9f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_user_email_lower', [sa.text('lower(email)')], unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_email_lower')
@@ -1,15 +1,44 @@
-from fastapi import APIRouter, Depends
+from functools import partial
+from typing import Optional
+
+from fastapi import (
+    APIRouter, Depends, File, Query, Request, Response, UploadFile,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.utils import get_project_or_404
+from app.api.utils import (
+    ExportFilters,
+    Fields,
+    Page,
+    cached_response,
+    conditional_response,
+    get_project_or_404,
+    list_cache_key,
+    list_etag,
+    read_upload_text,
+    rows_response,
+)
 from app.core.db import get_async_session
 from app.core.user import current_superuser
+from app.crud.investment import investment_crud
+from app.models import CharityProject
 from app.schemas.charity_project import (
+    CharityProjectBatch,
     CharityProjectCreate,
     CharityProjectDB,
     CharityProjectUpdate,
 )
-from app.services.charity_project import CharityProjectService
+from app.schemas.investment import InvestmentDB
+from app.services.charity_project import (
+    PROJECT_COLUMNS,
+    CharityProjectService,
+)
+from app.services.export import (
+    ExportFormat,
+    StreamFormat,
+    export_rows,
+    stream_rows,
+)
 
 router = APIRouter()
 
@@ -32,6 +61,35 @@ async def create_new_charity_project(
     return new_project
 
 
+@router.post(
+    '/batch',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def create_charity_projects_batch(
+    projects: CharityProjectBatch,
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await charity_project_service.create_projects(projects, session)
+
+
+@router.post(
+    '/import',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_charity_projects(
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    projects = charity_project_service.read_projects_csv(
+        await read_upload_text(file),
+    )
+    return await charity_project_service.create_projects(projects, session)
+
+
 @router.patch(
     '/{project_id}',
     response_model=CharityProjectDB,
@@ -57,10 +115,61 @@ async def partially_update_charity_project(
     response_model=list[CharityProjectDB]
 )
 async def get_all_charity_projects(
+    request: Request,
+    response: Response,
+    page: Page = Depends(),
+    fields: Optional[tuple[str, ...]] = Depends(Fields(*PROJECT_COLUMNS)),
     session: AsyncSession = Depends(get_async_session)
 ):
-    projects = await charity_project_service.get_all_projects(session)
-    return projects
+    async def build():
+        projects = await charity_project_service.get_all_projects(
+            session, page.fetch_limit, page.after, fields or PROJECT_COLUMNS,
+        )
+        return rows_response(
+            page.paginate(projects, response),
+            fields or PROJECT_COLUMNS,
+            response,
+            exclude_none=fields is None,
+        )
+
+    return await conditional_response(
+        request,
+        list_etag(CharityProject.__tablename__, page, fields),
+        partial(
+            cached_response, list_cache_key(CharityProject, page, fields),
+            build,
+        ),
+    )
+
+
+@router.get('/stream')
+async def stream_all_charity_projects(
+    stream_format: StreamFormat = Query(StreamFormat.ndjson, alias='format'),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return stream_rows(
+        charity_project_service.stream_projects(session),
+        stream_format,
+    )
+
+
+@router.get('/export')
+async def export_charity_projects(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias='format'),
+    filters: ExportFilters = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return export_rows(
+        CharityProject,
+        PROJECT_COLUMNS,
+        charity_project_service.stream_projects(
+            session,
+            *filters.criteria(CharityProject),
+            order_by=filters.order_by(CharityProject),
+            chunk_size=export_format.chunk_size,
+        ),
+        export_format,
+    )
 
 
 @router.delete(
@@ -79,3 +188,21 @@ async def remove_charity_project(
         project, session,
     )
     return removed_project
+
+
+@router.get(
+    '/{project_id}/investments',
+    response_model=list[InvestmentDB],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_charity_project_investments(
+    project_id: int,
+    response: Response,
+    page: Page = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    await get_project_or_404(project_id, session)
+    investments = await investment_crud.get_page(
+        session, page.fetch_limit, page.after, charity_project_id=project_id,
+    )
+    return page.paginate(investments, response)
@@ -1,11 +1,40 @@
-from fastapi import APIRouter, Depends
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import (
+    APIRouter, Depends, HTTPException, Query, Request, Response,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.utils import (
+    ExportFilters,
+    Fields,
+    Page,
+    conditional_response,
+    get_users_or_404,
+    list_etag,
+    rows_response,
+)
 from app.core.db import get_async_session
 from app.core.user import current_user, current_superuser
-from app.crud.donation import donation_crud
-from app.models import User
-from app.schemas.donation import DonationCreate, DonationDB, DonationDBFull
+from app.crud.donation import (
+    DONATION_COLUMNS,
+    USER_DONATION_COLUMNS,
+    donation_crud,
+    user_version_key,
+)
+from app.crud.investment import investment_crud
+from app.models import Donation, User
+from app.schemas.donation import (
+    DonationBatch, DonationCreate, DonationDB, DonationDBFull,
+)
+from app.schemas.investment import InvestmentDB
+from app.services.export import (
+    ExportFormat,
+    StreamFormat,
+    export_rows,
+    stream_rows,
+)
 
 router = APIRouter()
 
@@ -27,17 +56,68 @@ async def create_donation(
     return new_donation
 
 
+@router.post(
+    '/batch',
+    response_model=list[DonationDB],
+    response_model_exclude_none=True,
+)
+async def create_donations_batch(
+    donations: DonationBatch,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    owner_ids = {
+        donation.user_id for donation in donations
+        if donation.user_id is not None
+    }
+    if owner_ids and not user.is_superuser:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail='Жертвовать от имени других может только суперюзер.',
+        )
+    owners = await get_users_or_404(owner_ids, session) if owner_ids else {}
+    return await donation_crud.create_and_process_donations(
+        [
+            (
+                DonationCreate(**donation.dict(exclude={'user_id'})),
+                owners.get(donation.user_id, user),
+            )
+            for donation in donations
+        ],
+        session,
+    )
+
+
 @router.get(
     '/my',
     response_model=list[DonationDB],
     response_model_exclude={'user_id'}
 )
 async def get_my_donations(
+    request: Request,
+    response: Response,
+    page: Page = Depends(),
+    fields: Optional[tuple[str, ...]] = Depends(
+        Fields(*USER_DONATION_COLUMNS)
+    ),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user)
 ):
-    donations = await donation_crud.get_by_user(session=session, user=user)
-    return donations
+    async def build():
+        donations = await donation_crud.get_by_user(
+            session=session, user=user,
+            limit=page.fetch_limit, after=page.after,
+            columns=fields or USER_DONATION_COLUMNS,
+        )
+        return rows_response(
+            page.paginate(donations, response),
+            fields or USER_DONATION_COLUMNS,
+            response,
+        )
+
+    return await conditional_response(
+        request, list_etag(user_version_key(user.id), page, fields), build,
+    )
 
 
 @router.get(
@@ -47,7 +127,79 @@ async def get_my_donations(
     dependencies=[Depends(current_superuser)],
 )
 async def get_all_donations(
+    response: Response,
+    page: Page = Depends(),
+    fields: Optional[tuple[str, ...]] = Depends(Fields(*DONATION_COLUMNS)),
+    session: AsyncSession = Depends(get_async_session),
+):
+    all_donations = await donation_crud.get_page(
+        session, page.fetch_limit, page.after, fields or DONATION_COLUMNS,
+    )
+    return rows_response(
+        page.paginate(all_donations, response),
+        fields or DONATION_COLUMNS,
+        response,
+        exclude_none=fields is None,
+    )
+
+
+@router.get(
+    '/stream',
+    dependencies=[Depends(current_superuser)],
+)
+async def stream_all_donations(
+    stream_format: StreamFormat = Query(StreamFormat.ndjson, alias='format'),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return stream_rows(
+        donation_crud.stream_chunks(session, DONATION_COLUMNS),
+        stream_format,
+    )
+
+
+@router.get(
+    '/export',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_donations(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias='format'),
+    filters: ExportFilters = Depends(),
     session: AsyncSession = Depends(get_async_session),
 ):
-    all_donations = await donation_crud.get_multi(session)
-    return all_donations
+    return export_rows(
+        Donation,
+        DONATION_COLUMNS,
+        donation_crud.stream_chunks(
+            session,
+            DONATION_COLUMNS,
+            *filters.criteria(Donation),
+            order_by=filters.order_by(Donation),
+            chunk_size=export_format.chunk_size,
+        ),
+        export_format,
+    )
+
+
+@router.get(
+    '/{donation_id}/investments',
+    response_model=list[InvestmentDB],
+)
+async def get_donation_investments(
+    donation_id: int,
+    response: Response,
+    page: Page = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    donation = await donation_crud.get_donation_by_id(donation_id, session)
+    if donation is None or (
+        donation.user_id != user.id and not user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Пожертвование не найдено.',
+        )
+    investments = await investment_crud.get_page(
+        session, page.fetch_limit, page.after, donation_id=donation_id,
+    )
+    return page.paginate(investments, response)
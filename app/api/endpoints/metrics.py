@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session
+from app.core.metrics import metrics
+from app.core.user import current_superuser
+from app.services.open_pool import open_pool_index
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    dependencies=[Depends(current_superuser)],
+)
+def get_metrics():
+    return metrics.snapshot()
+
+
+@router.get(
+    '/open_pool',
+    dependencies=[Depends(current_superuser)],
+)
+async def check_open_pool_index(
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await open_pool_index.verify(session)
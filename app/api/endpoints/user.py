@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import (
+    APIRouter, Depends, File, HTTPException, Query, UploadFile,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.user import auth_backend, fastapi_users
-from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.api.utils import read_upload_text
+from app.core.db import get_async_session
+from app.core.user import auth_backend, current_superuser, fastapi_users
+from app.schemas.user import (
+    UserCreate, UserImportReport, UserRead, UserUpdate,
+)
+from app.services.user_import import ImportFormat, import_users, read_records
 
 router = APIRouter()
 
@@ -21,6 +29,25 @@ for route in user_routers.routes:
     if 'DELETE' in route.methods:
         user_routers.routes.remove(route)
         break
+
+
+@router.post(
+    '/users/import',
+    tags=['users'],
+    response_model=UserImportReport,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_users_file(
+    file: UploadFile = File(...),
+    import_format: ImportFormat = Query(ImportFormat.csv, alias='format'),
+    session: AsyncSession = Depends(get_async_session),
+):
+    lines = await read_upload_text(file)
+    return UserImportReport.from_orm(
+        await import_users(session, read_records(lines, import_format))
+    )
+
+
 router.include_router(
     fastapi_users.get_users_router(UserRead, UserUpdate),
     prefix='/users',
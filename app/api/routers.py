@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from app.api.endpoints import (
     charityproject_router,
     donation_router,
+    metrics_router,
     user_router,
 )
 
@@ -16,4 +17,8 @@ main_router.include_router(
     donation_router, prefix='/donation', tags=['Donation']
 )
 
+main_router.include_router(
+    metrics_router, prefix='/metrics', tags=['Metrics']
+)
+
 main_router.include_router(user_router)
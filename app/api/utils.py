@@ -1,10 +1,31 @@
+import binascii
+import io
+import json
+import secrets
+import time
+import zlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, timedelta
 from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Optional, Sequence, Union
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Query, Request, Response, UploadFile
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.encoders import FastJSONResponse, response_class
+from app.core.metrics import metrics
 from app.crud.charity_project import charity_project_crud
-from app.models import CharityProject
+from app.models import CharityProject, User
+from app.models.base import BaseModel
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+ETAG_PROCESS_TOKEN = secrets.token_hex(4)
 
 
 async def get_project_or_404(
@@ -20,3 +41,308 @@ async def get_project_or_404(
             detail='Проект не найден.',
         )
     return charity_project
+
+
+async def get_users_or_404(
+    user_ids: set[int],
+    session: AsyncSession,
+) -> dict[int, User]:
+    """Пользователи по id одним запросом; 404, если кого-то нет."""
+    users = {
+        user.id: user for user in (await session.execute(
+            select(User).where(User.id.in_(user_ids))
+        )).scalars()
+    }
+    missing = user_ids - users.keys()
+    if missing:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Пользователи не найдены: {}.'.format(
+                ', '.join(map(str, sorted(missing)))
+            ),
+        )
+    return users
+
+
+async def read_upload_text(file: UploadFile) -> io.StringIO:
+    """Текст загруженного файла в UTF-8 (BOM допускается).
+
+    Файл читается через ``UploadFile.read``, которая не блокирует цикл
+    событий, даже если Starlette уже сбросил загрузку на диск.
+    """
+    try:
+        text = (await file.read()).decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='Файл должен быть в кодировке UTF-8.',
+        )
+    return io.StringIO(text, newline='')
+
+
+def encode_cursor(last_id: int) -> str:
+    return urlsafe_b64encode(
+        json.dumps({'id': last_id}).encode()
+    ).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        last_id = json.loads(
+            urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        )['id']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+    if not isinstance(last_id, int):
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='Некорректный курсор.',
+        )
+    return last_id
+
+
+class Page:
+    """Параметры страницы списка: ``limit`` и непрозрачный ``cursor``.
+
+    Без обоих параметров список возвращается целиком, как до появления
+    пагинации; ``cursor`` без ``limit`` даёт страницу по умолчанию.
+    Из базы читается на одну строку больше ``limit``: по ней ``paginate``
+    узнаёт, есть ли следующая страница, без отдельного COUNT.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+    ) -> None:
+        self.after = decode_cursor(cursor) if cursor else None
+        if limit is None and self.after is not None:
+            limit = DEFAULT_PAGE_SIZE
+        self.limit = limit
+
+    @property
+    def fetch_limit(self) -> Optional[int]:
+        return None if self.limit is None else self.limit + 1
+
+    def paginate(
+        self,
+        items: Sequence[Union[BaseModel, Row]],
+        response: Response,
+    ) -> Sequence[Union[BaseModel, Row]]:
+        if self.limit is not None and len(items) > self.limit:
+            items = items[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                items[-1].id
+            )
+        return items
+
+
+class Fields:
+    """Параметр ``?fields=``: подмножество полей ответа через запятую.
+
+    Выбранные поля сужают и SELECT, и тело ответа.
+    """
+
+    def __init__(self, *allowed: str) -> None:
+        self.allowed = allowed
+
+    def __call__(
+        self,
+        fields: Optional[str] = None,
+    ) -> Optional[tuple[str, ...]]:
+        if fields is None:
+            return None
+        selected = tuple(dict.fromkeys(
+            field.strip() for field in fields.split(',') if field.strip()
+        ))
+        unknown = [field for field in selected if field not in self.allowed]
+        if not selected or unknown:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=(
+                    'Неизвестные поля: ' + ', '.join(unknown) if unknown
+                    else 'Не выбрано ни одного поля.'
+                ),
+            )
+        return selected
+
+
+def rows_response(
+    rows: Sequence[Row],
+    columns: Sequence[str],
+    response: Response,
+    exclude_none: bool = False,
+) -> Response:
+    """Строки из базы сразу в JSON, минуя модель ответа.
+
+    Строки выбраны ровно по полям схемы ответа и уже имеют нужные типы,
+    поэтому повторная валидация pydantic не нужна. Класс ответа задаёт
+    ``FAST_JSON_RESPONSES``: без него строки кодируются через
+    ``jsonable_encoder`` и стандартный ``JSONResponse``. Заголовки
+    страницы переносятся из ``response``.
+    """
+    content = []
+    for row in rows:
+        item = {column: getattr(row, column) for column in columns}
+        if exclude_none:
+            item = {
+                key: value for key, value in item.items() if value is not None
+            }
+        content.append(item)
+    response_cls = response_class()
+    if response_cls is not FastJSONResponse:
+        content = jsonable_encoder(content)
+    return response_cls(content, headers=dict(response.headers))
+
+
+def list_cache_key(
+    model: BaseModel,
+    page: Page,
+    fields: Optional[tuple[str, ...]],
+) -> str:
+    """Ключ кэша страницы списка; версия таблицы читается до запроса."""
+    table = model.__tablename__
+    return ':'.join(map(str, (
+        table, cache.version(table), 'list',
+        page.limit, page.after, ','.join(fields or ()),
+    )))
+
+
+async def cached_response(
+    key: str,
+    build: Callable[[], Awaitable[Response]],
+) -> Response:
+    """Готовое тело ответа из кэша или результат ``build`` с записью в кэш.
+
+    Кэш живёт в памяти процесса и сбрасывается только записями этого
+    процесса, поэтому используется лишь при ``SINGLE_PROCESS``.
+    """
+    if not settings.single_process:
+        return await build()
+    name = key.partition(':')[0]
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.increment(f'cache.{name}.hit')
+        body, next_cursor = cached
+        return Response(
+            body,
+            media_type='application/json',
+            headers={NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None,
+        )
+    metrics.increment(f'cache.{name}.miss')
+    response = await build()
+    cache.set(key, (response.body, response.headers.get(NEXT_CURSOR_HEADER)))
+    return response
+
+
+def etags_enabled() -> bool:
+    # Версии таблиц ведутся в памяти процесса: при нескольких воркерах
+    # запись в соседнем воркере не изменила бы ETag этого.
+    return settings.conditional_get and settings.single_process
+
+
+def list_etag(
+    version_key: str,
+    page: Page,
+    fields: Optional[tuple[str, ...]],
+    clock: Callable[[], float] = time.monotonic,
+) -> Optional[str]:
+    """Слабый ETag страницы списка из версии данных и параметров.
+
+    Метка процесса не даёт совпасть ETag после перезапуска, когда
+    счётчики версий начинаются заново. Ключ версии входит в хэш, чтобы
+    у разных пользователей с равными версиями ETag не совпадали, а
+    номер интервала ``etag_ttl`` ограничивает срок жизни ETag, если
+    данные изменил другой процесс (например, скрипт пересчёта).
+    """
+    if not etags_enabled():
+        return None
+    params = '{}:{}:{}:{}'.format(
+        version_key, page.limit, page.after, ','.join(fields or ()),
+    )
+    epoch = int(clock() // settings.etag_ttl) if settings.etag_ttl > 0 else 0
+    return 'W/"{}-{}-{}-{:08x}"'.format(
+        ETAG_PROCESS_TOKEN,
+        epoch,
+        cache.version(version_key),
+        zlib.crc32(params.encode()),
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {
+        tag.strip().removeprefix('W/') for tag in if_none_match.split(',')
+    }
+    return '*' in candidates or etag.removeprefix('W/') in candidates
+
+
+async def conditional_response(
+    request: Request,
+    etag: Optional[str],
+    build: Callable[[], Awaitable[Response]],
+) -> Response:
+    """304 без запроса к базе, если у клиента актуальная версия."""
+    if etag is not None and etag_matches(
+        request.headers.get('if-none-match'), etag,
+    ):
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag},
+        )
+    response = await build()
+    if etag is not None:
+        response.headers['ETag'] = etag
+    return response
+
+
+def day_bound(
+    value: Optional[Union[datetime, date]],
+    end: bool = False,
+) -> Optional[datetime]:
+    """Граница диапазона; дата без времени покрывает весь день."""
+    if value is None or isinstance(value, datetime):
+        return value
+    start = datetime.combine(value, datetime.min.time())
+    return start + timedelta(days=1) if end else start
+
+
+class ExportFilters:
+    """Диапазоны дат выгрузки: ``*_from`` включительно, ``*_to`` нет.
+
+    Вместо момента времени можно передать дату: ``*_from=2024-01-01``
+    начинается с полуночи этого дня, а ``*_to=2024-01-31`` включает
+    весь указанный день. Строки выгружаются в порядке фильтруемой даты,
+    чтобы диапазон читался по её индексу без сортировки всей выборки.
+    """
+
+    def __init__(
+        self,
+        create_date_from: Optional[Union[datetime, date]] = None,
+        create_date_to: Optional[Union[datetime, date]] = None,
+        close_date_from: Optional[Union[datetime, date]] = None,
+        close_date_to: Optional[Union[datetime, date]] = None,
+    ) -> None:
+        self.ranges = {
+            'close_date': (
+                day_bound(close_date_from), day_bound(close_date_to, True),
+            ),
+            'create_date': (
+                day_bound(create_date_from), day_bound(create_date_to, True),
+            ),
+        }
+
+    def criteria(self, model: BaseModel) -> list[Any]:
+        criteria = []
+        for column, (start, end) in self.ranges.items():
+            if start is not None:
+                criteria.append(getattr(model, column) >= start)
+            if end is not None:
+                criteria.append(getattr(model, column) < end)
+        return criteria
+
+    def order_by(self, model: BaseModel) -> tuple[Any, ...]:
+        for column, bounds in self.ranges.items():
+            if bounds != (None, None):
+                return getattr(model, column), model.id
+        return (model.id,)
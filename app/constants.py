@@ -4,3 +4,17 @@ MIN_NAME_LENGTH = 1
 MAX_NAME_LENGTH = 100
 
 MIN_DESCRIPTION_LENGTH = 1
+
+ALLOCATION_CHUNK_SIZE = 500
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+MAX_DONATION_BATCH_SIZE = 1000
+MAX_PROJECT_BATCH_SIZE = 1000
+
+EXPORT_CHUNK_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 65536
+
+USER_IMPORT_BATCH_SIZE = 500
+USER_IMPORT_MAX_ERRORS = 100
@@ -0,0 +1,169 @@
+"""Кэш ответов на чтение с инвалидацией по версиям таблиц.
+
+Ключи включают версию таблицы, а запись в таблицу после commit
+увеличивает версию, поэтому старые записи просто перестают читаться
+и вытесняются по LRU или TTL. Хранилище выбирается настройкой
+``cache_backend`` (путь к классу), интерфейс задан ``CacheBackend``.
+
+``SingleFlight`` объединяет одновременные одинаковые чтения, которые
+ещё не попали в кэш.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from importlib import import_module
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class CacheBackend(ABC):
+    """Интерфейс хранилища кэша."""
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или ``None``, если его нет или оно устарело."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Сохраняет значение на ``ttl`` секунд."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удаляет значение; отсутствующий ключ не ошибка."""
+
+    @abstractmethod
+    def version(self, table: str) -> int:
+        """Текущая версия таблицы."""
+
+    @abstractmethod
+    def bump(self, *tables: str) -> None:
+        """Увеличивает версии таблиц после записи в них."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Удаляет все значения, не трогая версии."""
+
+
+class MemoryCache(CacheBackend):
+    """LRU с TTL и ограничением размера в памяти процесса.
+
+    Версии таблиц хранятся отдельно от записей и не вытесняются:
+    сброс версии вернул бы в оборот устаревшие записи.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_size, ttl)
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        self._entries[key] = self._clock() + self.ttl, value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def version(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def bump(self, *tables: str) -> None:
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_cache(
+    max_size: Optional[int] = None,
+    ttl: Optional[float] = None,
+) -> CacheBackend:
+    module_name, _, class_name = settings.cache_backend.rpartition('.')
+    backend = getattr(import_module(module_name), class_name)
+    return backend(
+        settings.cache_max_size if max_size is None else max_size,
+        settings.cache_ttl if ttl is None else ttl,
+    )
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых чтений в один запрос к базе.
+
+    Первый вызов с ключом выполняет ``fetch``, остальные ждут его
+    результат. Результат должен быть неизменяемым и не зависеть от
+    сессии, поэтому объединяются только чтения строк, а не объектов ORM.
+    Если первый вызов отменён, ожидающие не отменяются, а повторяют
+    чтение своим ``fetch``.
+    """
+
+    _retry = object()
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        if not settings.read_coalescing:
+            return await fetch()
+        while key in self._calls:
+            metrics.increment(f'{self.name}.shared')
+            result = await asyncio.shield(self._calls[key])
+            if result is not self._retry:
+                return result
+        metrics.increment(f'{self.name}.executed')
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.set_result(self._retry)
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            # Ошибку получает сам вызывающий; ожидающих может не быть.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+cache = create_cache()
+read_flight = SingleFlight('read_coalescing')
@@ -10,6 +10,27 @@ class Settings(BaseSettings):
     secret: str = 'SECRET'
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
+    query_stats_headers: bool = False
+    single_process: bool = False
+    allocation_serialized: bool = True
+    allocation_lock_path: Optional[str] = None
+    donation_batch_window_ms: float = 0
+    donation_batch_max_size: int = 64
+    open_pool_index: bool = False
+    fast_json_responses: bool = True
+    cache_backend: str = 'app.core.cache.MemoryCache'
+    cache_max_size: int = 1024
+    cache_ttl: float = 30
+    conditional_get: bool = True
+    etag_ttl: float = 30
+    read_coalescing: bool = True
+    stateless_jwt: bool = False
+    user_cache_max_size: int = 1024
+    user_cache_ttl: float = 30
+    password_hash_rounds: int = 12
+    password_hash_concurrency: int = 2
+    password_hash_queue_size: int = 64
+    user_import_workers: Optional[int] = None
 
     class Config:
         env_file = '.env'
@@ -1,9 +1,20 @@
-from sqlalchemy import Column, Integer
+import contextlib
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Optional
+
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.orm import (
+    Session, declarative_base, declared_attr, sessionmaker,
+)
 
 from app.core.config import settings
 
+UNIT_OF_WORK_KEY = 'unit_of_work'
+AFTER_COMMIT_KEY = 'after_commit'
+
 
 class PreBase:
 
@@ -24,3 +35,61 @@ AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
 async def get_async_session():
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+@dataclass
+class DBStats:
+    commits: int = 0
+    statements: int = 0
+
+
+db_stats: ContextVar[Optional[DBStats]] = ContextVar('db_stats', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context, many):
+    stats = db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+
+
+@event.listens_for(Session, 'after_commit')
+def count_commit(session):
+    stats = db_stats.get()
+    if stats is not None:
+        stats.commits += 1
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Выполнить callback после успешного commit текущей единицы работы."""
+    session.sync_session.info.setdefault(AFTER_COMMIT_KEY, []).append(
+        callback
+    )
+
+
+@contextlib.asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Одна транзакция и один commit на весь путь записи.
+
+    Вложенные вызовы работают в транзакции внешнего. После commit объекты
+    не протухают, поэтому для ответа не нужен refresh.
+    """
+    sync_session = session.sync_session
+    if sync_session.info.get(UNIT_OF_WORK_KEY):
+        yield session
+        return
+    expire_on_commit = sync_session.expire_on_commit
+    sync_session.info[UNIT_OF_WORK_KEY] = True
+    sync_session.expire_on_commit = False
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        sync_session.info.pop(AFTER_COMMIT_KEY, None)
+        await session.rollback()
+        raise
+    finally:
+        sync_session.info[UNIT_OF_WORK_KEY] = False
+        sync_session.expire_on_commit = expire_on_commit
+    for callback in sync_session.info.pop(AFTER_COMMIT_KEY, ()):
+        callback()
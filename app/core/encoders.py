@@ -0,0 +1,56 @@
+"""Кодирование JSON для ответов API и выгрузок.
+
+orjson используется, если установлен; даты в любом случае кодируются
+через ``isoformat()``, как это делает ``jsonable_encoder``.
+"""
+import json
+from datetime import datetime
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=json_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(
+        content,
+        default=json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':'),
+    ).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse, кодирующий через ``dumps``.
+
+    Принимает и готовые к JSON данные, и словари с датами, поэтому
+    доверенные строки из базы можно отдавать без модели ответа.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def response_class() -> type[JSONResponse]:
+    if settings.fast_json_responses:
+        return FastJSONResponse
+    return JSONResponse
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from typing import Any
+
+
+class Metrics:
+    """Счётчики и сводки наблюдений в памяти процесса."""
+
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, int] = defaultdict(int)
+        self._summaries: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        summary = self._summaries.setdefault(
+            name, {'count': 0, 'sum': 0, 'max': value},
+        )
+        summary['count'] += 1
+        summary['sum'] += value
+        summary['max'] = max(summary['max'], value)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            'counters': dict(self._counters),
+            'summaries': {
+                name: dict(summary, avg=summary['sum'] / summary['count'])
+                for name, summary in self._summaries.items()
+            },
+        }
+
+    def reset(self) -> None:
+        self._counters.clear()
+        self._summaries.clear()
+
+
+metrics = Metrics()
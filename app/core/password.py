@@ -0,0 +1,153 @@
+"""Хэширование и проверка паролей вне цикла событий.
+
+bcrypt намеренно медленный и при вызове из обработчика блокирует все
+запросы воркера. ``PasswordPool`` выполняет его в ограниченном пуле
+потоков (bcrypt отпускает GIL) и отклоняет вызовы сверх очереди.
+"""
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi_users.password import PasswordHelper
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+prepared_results: ContextVar[dict[tuple, Any]] = ContextVar(
+    'prepared_password_results', default={},
+)
+
+
+class PooledPasswordHelper(PasswordHelper):
+    """PasswordHelper для менеджера пользователей fastapi-users.
+
+    Менеджер вызывает ``hash`` и ``verify_and_update`` синхронно. Внутри
+    ``prepared`` их результат для указанного пароля заранее считается
+    в пуле, и синхронный вызов только забирает его; вне ``prepared``
+    helper считает на месте, как обычный ``PasswordHelper``.
+    """
+
+    def __init__(self, pool: 'PasswordPool', context: CryptContext) -> None:
+        super().__init__(context)
+        self.pool = pool
+
+    @contextlib.asynccontextmanager
+    async def prepared(
+        self,
+        password: str,
+        hashed_password: Optional[str] = None,
+    ) -> AsyncIterator[None]:
+        """Хэш ``password`` или, если задан ``hashed_password``, проверка."""
+        if hashed_password is None:
+            key = ('hash', password)
+            result = await self.pool.hash(password)
+        else:
+            key = ('verify', password, hashed_password)
+            result = await self.pool.verify_and_update(
+                password, hashed_password,
+            )
+        token = prepared_results.set({**prepared_results.get(), key: result})
+        try:
+            yield
+        finally:
+            prepared_results.reset(token)
+
+    def hash(self, password: str) -> str:
+        key = ('hash', password)
+        if key in prepared_results.get():
+            return prepared_results.get()[key]
+        return super().hash(password)
+
+    def verify_and_update(
+        self,
+        plain_password: str,
+        hashed_password: str,
+    ) -> tuple[bool, Optional[str]]:
+        key = ('verify', plain_password, hashed_password)
+        if key in prepared_results.get():
+            return prepared_results.get()[key]
+        return super().verify_and_update(plain_password, hashed_password)
+
+
+class PasswordPool:
+    """Пул для bcrypt с ограничением параллельности и очереди.
+
+    При ``concurrency == 0`` хэширование выполняется в цикле событий,
+    как раньше. Вызовы сверх ``concurrency + queue_size`` ожидающих
+    получают 503, чтобы всплеск входов не копил задержку.
+    """
+
+    def __init__(self, rounds: int, concurrency: int, queue_size: int) -> None:
+        context = CryptContext(
+            schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=rounds,
+        )
+        self._helper = PasswordHelper(context)
+        self.helper = PooledPasswordHelper(self, context)
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.concurrency <= 0:
+            return func(*args)
+        if self._pending >= self.concurrency + self.queue_size:
+            metrics.increment('password.rejected')
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Слишком много одновременных проверок паролей.',
+                headers={'Retry-After': '1'},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix='password',
+            )
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(func, *args),
+            )
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self._helper.hash, password)
+
+    async def verify_and_update(
+        self,
+        password: str,
+        hashed_password: str,
+    ) -> tuple[bool, Optional[str]]:
+        return await self._run(
+            self._helper.verify_and_update, password, hashed_password,
+        )
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Хэши пачки паролей; пачка делится между потоками пула."""
+        size = -(-len(passwords) // max(self.concurrency, 1))
+        parts = await asyncio.gather(*(
+            self._run(self._hash_all, passwords[start:start + size])
+            for start in range(0, len(passwords), size)
+        ))
+        return [hashed for part in parts for hashed in part]
+
+    def _hash_all(self, passwords: list[str]) -> list[str]:
+        return [self._helper.hash(password) for password in passwords]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_pool = PasswordPool(
+    settings.password_hash_rounds,
+    settings.password_hash_concurrency,
+    settings.password_hash_queue_size,
+)
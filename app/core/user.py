@@ -1,30 +1,163 @@
-from typing import Optional, Union
+import time
+from typing import Any, Callable, Optional, Union
 
-from fastapi import Depends, Request
+import jwt
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (
     BaseUserManager, FastAPIUsers, IntegerIDMixin, InvalidPasswordException,
 )
+from fastapi_users.exceptions import UserNotExists
 from fastapi_users.authentication import (
     AuthenticationBackend, BearerTransport, JWTStrategy,
 )
+from fastapi_users.jwt import decode_jwt, generate_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import create_cache
 from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.metrics import metrics
+from app.core.password import password_pool
 from app.models.user import User
 from app.schemas.user import UserCreate
 
 
+USER_COLUMNS = tuple(User.__table__.columns.keys())
+
+user_cache = create_cache(
+    settings.user_cache_max_size, settings.user_cache_ttl,
+)
+
+
+class CachedUserDatabase(SQLAlchemyUserDatabase):
+    """Чтение пользователя по id через кэш в памяти процесса.
+
+    В кэше хранятся значения колонок, а не объект: при попадании
+    объект присоединяется к сессии запроса через ``merge(load=False)``
+    без запроса к базе. Изменения через адаптер сбрасывают запись
+    только в своём процессе, а кэш хранит ``is_active`` и
+    ``is_superuser``, поэтому он включается лишь при ``SINGLE_PROCESS``.
+    """
+
+    async def get(self, id: int) -> Optional[User]:
+        if not settings.single_process:
+            return await super().get(id)
+        key = f'user:{id}'
+        values = user_cache.get(key)
+        if values is not None:
+            metrics.increment('cache.user.hit')
+            user = User(**values)
+            make_transient_to_detached(user)
+            return await self.session.merge(user, load=False)
+        metrics.increment('cache.user.miss')
+        user = await super().get(id)
+        if user is not None:
+            user_cache.set(key, {
+                column: getattr(user, column) for column in USER_COLUMNS
+            })
+        return user
+
+    async def create(self, create_dict: dict[str, Any]) -> User:
+        user = await super().create(create_dict)
+        self.invalidate(user)
+        return user
+
+    async def update(self, user: User, update_dict: dict[str, Any]) -> User:
+        user = await super().update(user, update_dict)
+        self.invalidate(user)
+        return user
+
+    async def delete(self, user: User) -> None:
+        await super().delete(user)
+        self.invalidate(user)
+
+    @staticmethod
+    def invalidate(user: User) -> None:
+        user_cache.delete(f'user:{user.id}')
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+    yield CachedUserDatabase(session, User)
 
 
 bearer_transport = BearerTransport(tokenUrl='auth/jwt/login')
 
 
+class TokenRevocations:
+    """Моменты, до которых claims токенов пользователя устарели.
+
+    Хранится в памяти процесса. Токены, выпущенные до его запуска,
+    тоже считаются устаревшими: отзывы, сделанные до перезапуска,
+    потеряны.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self.started_at = clock()
+        self._revoked: dict[int, float] = {}
+
+    def revoke(self, user_id: int) -> None:
+        self._revoked[user_id] = self._clock()
+
+    def is_fresh(self, user_id: int, issued_at: float) -> bool:
+        return issued_at > max(
+            self.started_at, self._revoked.get(user_id, 0),
+        )
+
+
+token_revocations = TokenRevocations()
+
+
+class ClaimsJWTStrategy(JWTStrategy):
+    """JWT, в который вложены email и флаги пользователя."""
+
+    async def write_token(self, user: User) -> str:
+        data = {
+            'user_id': str(user.id),
+            'aud': self.token_audience,
+            'iat': time.time(),
+            'email': user.email,
+            'is_active': user.is_active,
+            'is_superuser': user.is_superuser,
+            'is_verified': user.is_verified,
+        }
+        return generate_jwt(
+            data, self.encode_key, self.lifetime_seconds,
+            algorithm=self.algorithm,
+        )
+
+    def read_claims(self, token: Optional[str]) -> Optional[User]:
+        """Пользователь из claims или None, если им нельзя доверять."""
+        if token is None:
+            return None
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience,
+                algorithms=[self.algorithm],
+            )
+            user_id = int(data['user_id'])
+            fresh = token_revocations.is_fresh(user_id, data['iat'])
+        except (jwt.PyJWTError, KeyError, TypeError, ValueError):
+            return None
+        if not fresh:
+            return None
+        return User(
+            id=user_id,
+            email=data.get('email'),
+            is_active=data.get('is_active'),
+            is_superuser=data.get('is_superuser'),
+            is_verified=data.get('is_verified'),
+        )
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=settings.secret, lifetime_seconds=3600)
+    strategy_class = (
+        ClaimsJWTStrategy if settings.stateless_jwt else JWTStrategy
+    )
+    return strategy_class(secret=settings.secret, lifetime_seconds=3600)
 
 
 auth_backend = AuthenticationBackend(
@@ -35,6 +168,12 @@ auth_backend = AuthenticationBackend(
 
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
+    """Менеджер пользователей, хэширующий пароли в ``password_pool``.
+
+    Методы библиотеки вызываются как есть; обёртки лишь заранее считают
+    в пуле хэш или проверку пароля, которые библиотека затем возьмёт
+    у ``PooledPasswordHelper``.
+    """
 
     async def validate_password(
         self,
@@ -50,14 +189,53 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
                 reason='Password should not contain e-mail'
             )
 
+    async def create(
+        self,
+        user_create: UserCreate,
+        safe: bool = False,
+        request: Optional[Request] = None,
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+        async with self.password_helper.prepared(user_create.password):
+            return await super().create(user_create, safe, request)
+
+    async def authenticate(
+        self,
+        credentials: OAuth2PasswordRequestForm,
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except UserNotExists:
+            # Библиотека хэширует пароль и для неизвестного email.
+            user = None
+        async with self.password_helper.prepared(
+            credentials.password, user and user.hashed_password,
+        ):
+            return await super().authenticate(credentials)
+
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        if 'password' not in update_dict:
+            return await super()._update(user, update_dict)
+        await self.validate_password(update_dict['password'], user)
+        async with self.password_helper.prepared(update_dict['password']):
+            return await super()._update(user, update_dict)
+
     async def on_after_register(
             self, user: User, request: Optional[Request] = None
     ):
         print(f'Пользователь {user.email} зарегистрирован.')
 
+    async def on_after_update(
+            self,
+            user: User,
+            update_dict: dict[str, Any],
+            request: Optional[Request] = None,
+    ):
+        token_revocations.revoke(user.id)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
-    yield UserManager(user_db)
+    yield UserManager(user_db, password_pool.helper)
 
 
 fastapi_users = FastAPIUsers[User, int](
@@ -65,5 +243,48 @@ fastapi_users = FastAPIUsers[User, int](
     [auth_backend],
 )
 
-current_user = fastapi_users.current_user(active=True)
-current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+def claims_trusted() -> bool:
+    # Отзывы ведутся в памяти процесса: при нескольких воркерах отзыв
+    # в соседнем воркере не был бы виден этому.
+    return settings.stateless_jwt and settings.single_process
+
+
+def stateless_user(superuser: bool = False):
+    """Зависимость, доверяющая claims свежего токена без запроса к базе.
+
+    Если claims устарели (пользователь изменён после выпуска токена,
+    токен выпущен до запуска процесса или в нём нет claims),
+    пользователь читается из базы, как в ``fastapi_users.current_user``.
+    """
+
+    async def dependency(
+        token: Optional[str] = Depends(bearer_transport.scheme),
+        strategy: JWTStrategy = Depends(get_jwt_strategy),
+        user_manager: UserManager = Depends(get_user_manager),
+    ) -> User:
+        user = None
+        if claims_trusted() and isinstance(strategy, ClaimsJWTStrategy):
+            user = strategy.read_claims(token)
+        if user is not None:
+            metrics.increment('auth.claims')
+        else:
+            metrics.increment('auth.lookup')
+            user = await strategy.read_token(token, user_manager)
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if superuser and not user.is_superuser:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+        return user
+
+    return dependency
+
+
+if settings.stateless_jwt:
+    current_user = stateless_user()
+    current_superuser = stateless_user(superuser=True)
+else:
+    current_user = fastapi_users.current_user(active=True)
+    current_superuser = fastapi_users.current_user(
+        active=True, superuser=True,
+    )
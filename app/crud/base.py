@@ -1,12 +1,21 @@
-from typing import Type, TypeVar, Generic, Any
+from datetime import datetime
+from typing import (
+    Type, TypeVar, Generic, Any, AsyncIterator, Optional, Sequence, Union,
+)
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, tuple_, update
+from sqlalchemy.sql import Select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import ALLOCATION_CHUNK_SIZE, EXPORT_CHUNK_SIZE
+from app.core.cache import cache, read_flight
 from app.models.base import BaseModel
 
 ModelType = TypeVar('ModelType', bound=BaseModel)
 
+OPEN_POOL_COLUMNS = ('id', 'full_amount', 'invested_amount', 'create_date')
+
 
 class CRUDBase(Generic[ModelType]):
 
@@ -23,8 +32,7 @@ class CRUDBase(Generic[ModelType]):
     ) -> ModelType:
         db_obj = self.model(**obj_in)
         session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        await session.flush()
         return db_obj
 
     async def get_multi(
@@ -33,3 +41,146 @@ class CRUDBase(Generic[ModelType]):
     ):
         db_objs = await session.execute(select(self.model))
         return db_objs.scalars().all()
+
+    async def get_page(
+        self,
+        session: AsyncSession,
+        limit: Optional[int],
+        after: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+        **filters: Any,
+    ) -> Union[list[ModelType], list[Row]]:
+        """Страница объектов по возрастанию id, начиная после ``after``.
+
+        Страница читается диапазоном по первичному ключу, поэтому время
+        запроса не зависит от номера страницы и размера таблицы. Если
+        переданы ``columns``, выбираются только они (и id для курсора),
+        а вместо объектов ORM возвращаются строки. Одновременные
+        одинаковые чтения строк выполняются одним запросом: в ключ входит
+        версия таблицы, поэтому чтение после записи не получит ответ
+        запроса, начатого до неё. ``limit=None`` — все строки после
+        ``after``.
+        """
+        if columns is None:
+            query = select(self.model)
+        else:
+            columns = tuple(dict.fromkeys(('id', *columns)))
+            query = select(*(
+                getattr(self.model, column) for column in columns
+            ))
+        query = query.filter_by(**filters)
+        if after is not None:
+            query = query.where(self.model.id > after)
+        query = query.order_by(self.model.id).limit(limit)
+        if columns is None:
+            return (await session.execute(query)).scalars().all()
+
+        async def fetch() -> list[Row]:
+            return (await session.execute(query)).all()
+
+        table = self.model.__tablename__
+        return await read_flight.do(
+            (
+                table, cache.version(table), limit, after, columns,
+                tuple(sorted(filters.items())),
+            ),
+            fetch,
+        )
+
+    async def stream_chunks(
+        self,
+        session: AsyncSession,
+        columns: Sequence[str],
+        *criteria: Any,
+        order_by: Sequence[Any] = (),
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[Row]]:
+        """Строки через серверный курсор, по умолчанию по возрастанию id.
+
+        В памяти одновременно находится не больше одной порции.
+        """
+        result = await session.stream(
+            select(*(getattr(self.model, column) for column in columns))
+            .where(*criteria)
+            .order_by(*(order_by or (self.model.id,)))
+            .execution_options(max_row_buffer=chunk_size)
+        )
+        try:
+            async for chunk in result.partitions(chunk_size):
+                yield chunk
+        finally:
+            await result.close()
+
+    def fifo_query(
+        self,
+        columns: Sequence[str],
+        *criteria: Any,
+        after: Optional[tuple[datetime, int]] = None,
+        limit: int = ALLOCATION_CHUNK_SIZE,
+    ) -> Select:
+        """Порция строк в порядке FIFO после ключа ``after``.
+
+        Ключ сравнивается как кортеж, чтобы порция читалась диапазоном
+        по индексу (create_date, id), а не его полным просмотром.
+        """
+        model = self.model
+        query = select(
+            *(getattr(model, column) for column in columns),
+        ).where(*criteria)
+        if after is not None:
+            query = query.where(
+                tuple_(model.create_date, model.id) > tuple_(*after)
+            )
+        return query.order_by(model.create_date, model.id).limit(limit)
+
+    async def iter_fifo_chunks(
+        self,
+        session: AsyncSession,
+        columns: Sequence[str],
+        *criteria: Any,
+        chunk_size: int = ALLOCATION_CHUNK_SIZE,
+    ) -> AsyncIterator[list[Row]]:
+        """Строки в порядке FIFO порциями по ключу (create_date, id)."""
+        last_key = None
+        while True:
+            chunk = (await session.execute(self.fifo_query(
+                columns, *criteria, after=last_key, limit=chunk_size,
+            ))).all()
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last_key = chunk[-1].create_date, chunk[-1].id
+
+    def iter_open_chunks(
+        self,
+        session: AsyncSession,
+        chunk_size: int = ALLOCATION_CHUNK_SIZE,
+    ) -> AsyncIterator[list[Row]]:
+        return self.iter_fifo_chunks(
+            session,
+            OPEN_POOL_COLUMNS,
+            self.model.fully_invested == False,  # noqa
+            chunk_size=chunk_size,
+        )
+
+    async def bulk_update(
+        self,
+        values: list[dict[str, Any]],
+        session: AsyncSession,
+    ) -> None:
+        """Одно executemany-обновление строк по id без загрузки объектов."""
+        if not values:
+            return
+        table = self.model.__table__
+        stmt = update(table).where(
+            table.c.id == bindparam('b_id')
+        ).values({
+            column: bindparam(f'b_{column}')
+            for column in values[0] if column != 'id'
+        })
+        await session.execute(stmt, [
+            {f'b_{column}': value for column, value in row.items()}
+            for row in values
+        ])
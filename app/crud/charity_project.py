@@ -1,7 +1,7 @@
 from typing import Optional
 
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
@@ -20,6 +20,23 @@ class CRUDCharityProject(CRUDBase):
         obj_in_data = obj_in.dict()
         return await self.create(obj_in_data, session)
 
+    async def bulk_create_projects(
+        self,
+        objs_in: list[CharityProjectCreate],
+        session: AsyncSession,
+    ) -> list[CharityProject]:
+        """Одна executemany-вставка и одно чтение созданных проектов."""
+        await session.execute(
+            insert(CharityProject.__table__),
+            [obj_in.dict() for obj_in in objs_in],
+        )
+        db_projects = await session.execute(
+            select(CharityProject).where(
+                CharityProject.name.in_([obj_in.name for obj_in in objs_in]),
+            ).order_by(CharityProject.id)
+        )
+        return db_projects.scalars().all()
+
     async def update_project(
         self,
         db_obj: CharityProject,
@@ -32,8 +49,7 @@ class CRUDCharityProject(CRUDBase):
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        await session.flush()
         return db_obj
 
     async def remove_project(
@@ -42,7 +58,7 @@ class CRUDCharityProject(CRUDBase):
         session: AsyncSession,
     ) -> CharityProject:
         await session.delete(db_obj)
-        await session.commit()
+        await session.flush()
         return db_obj
 
     async def get_id_by_name(
@@ -57,6 +73,18 @@ class CRUDCharityProject(CRUDBase):
         )
         return db_project_id.scalars().first()
 
+    async def get_existing_names(
+        self,
+        project_names: list[str],
+        session: AsyncSession,
+    ) -> list[str]:
+        db_names = await session.execute(
+            select(CharityProject.name).where(
+                CharityProject.name.in_(project_names),
+            ).order_by(CharityProject.name)
+        )
+        return db_names.scalars().all()
+
     async def get_project_by_id(
         self,
         project_id: int,
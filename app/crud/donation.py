@@ -1,10 +1,28 @@
-from sqlalchemy import select
+from functools import partial
+from typing import Optional, Sequence, Union
+
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.cache import cache
+from app.core.db import after_commit, unit_of_work
 from app.crud.base import CRUDBase
-from app.services.investment import donation_process
+from app.services.allocator import MicroBatcher, allocation_engine
+from app.services.investment import allocate
 from app.models import CharityProject, Donation, User
-from app.schemas.donation import DonationCreate
+from app.schemas.donation import DonationCreate, DonationDB, DonationDBFull
+
+DONATION_COLUMNS = tuple(DonationDBFull.__fields__)
+USER_DONATION_COLUMNS = tuple(
+    field for field in DonationDB.__fields__ if field != 'user_id'
+)
+
+
+def user_version_key(user_id: int) -> str:
+    """Версия пожертвований пользователя для кэша и ETag."""
+    return f'{Donation.__tablename__}:user:{user_id}'
 
 
 class CRUDDonation(CRUDBase[Donation]):
@@ -15,28 +33,87 @@ class CRUDDonation(CRUDBase[Donation]):
         session: AsyncSession,
         user: User,
     ) -> Donation:
-        obj_in_data = obj_in.dict()
-        obj_in_data['user_id'] = user.id
-        db_obj = self.model(**obj_in_data)
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
-
-        db_obj = await donation_process(
-            db_obj, CharityProject, session,
+        if settings.donation_batch_window_ms:
+            return await donation_batcher.submit(
+                (obj_in, user),
+                session,
+                settings.donation_batch_window_ms,
+                settings.donation_batch_max_size,
+            )
+        db_objs = await self.create_and_process_donations(
+            [(obj_in, user)], session,
         )
-        await session.commit()
-        await session.refresh(db_obj)
-        return db_obj
+        return db_objs[0]
 
-    async def get_by_user(
-        self, user: User, session: AsyncSession
+    async def create_and_process_donations(
+        self,
+        objs_in: list[tuple[DonationCreate, User]],
+        session: AsyncSession,
+    ) -> list[Donation]:
+        async with allocation_engine.turn(), unit_of_work(session):
+            db_objs = await self.bulk_create_donations(objs_in, session)
+            await allocate(db_objs, CharityProject, session)
+            after_commit(session, partial(cache.bump, *{
+                user_version_key(user.id) for _, user in objs_in
+            }))
+        return db_objs
+
+    async def bulk_create_donations(
+        self,
+        objs_in: list[tuple[DonationCreate, User]],
+        session: AsyncSession,
     ) -> list[Donation]:
-        donations = await session.execute(select(Donation).where(
-            Donation.user_id == user.id,
-        ))
-        donations = donations.scalars().all()
-        return donations
+        """Одна executemany-вставка и одно чтение созданных пожертвований.
+
+        Созданные строки читаются как последние ``len(objs_in)`` по id:
+        SQLite держит блокировку записи от вставки до commit, поэтому
+        чужие строки между ними появиться не могут. Для других СУБД
+        такой гарантии нет, и объекты, как и одиночное пожертвование,
+        вставляются через flush.
+        """
+        dialect = session.sync_session.get_bind().dialect.name
+        if dialect != 'sqlite' or len(objs_in) == 1:
+            db_objs = [
+                self.model(**obj_in.dict(), user_id=user.id)
+                for obj_in, user in objs_in
+            ]
+            session.add_all(db_objs)
+            await session.flush()
+            return db_objs
+        await session.execute(insert(Donation.__table__), [
+            dict(obj_in.dict(), user_id=user.id) for obj_in, user in objs_in
+        ])
+        db_objs = await session.execute(
+            select(Donation).order_by(Donation.id.desc()).limit(len(objs_in))
+        )
+        return db_objs.scalars().all()[::-1]
+
+    async def get_by_user(
+        self,
+        user: User,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Union[list[Donation], list[Row]]:
+        return await self.get_page(
+            session, limit, after, columns, user_id=user.id,
+        )
+
+    async def get_donation_by_id(
+        self,
+        donation_id: int,
+        session: AsyncSession,
+    ) -> Optional[Donation]:
+        db_donation = await session.execute(
+            select(Donation).where(
+                Donation.id == donation_id,
+            )
+        )
+        return db_donation.scalars().first()
 
 
 donation_crud = CRUDDonation(Donation)
+donation_batcher = MicroBatcher(
+    'donation_batch', donation_crud.create_and_process_donations,
+)
@@ -0,0 +1,21 @@
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models import Investment
+
+
+class CRUDInvestment(CRUDBase[Investment]):
+
+    async def bulk_create(
+        self,
+        values: list[dict[str, Any]],
+        session: AsyncSession,
+    ) -> None:
+        if values:
+            await session.execute(insert(self.model.__table__), values)
+
+
+investment_crud = CRUDInvestment(Investment)
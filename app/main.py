@@ -1,17 +1,49 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from app.api.routers import main_router
 from app.core.config import settings
-from app.core.init_db import create_first_superuser
+from app.core.db import DBStats, db_stats
+from app.core.encoders import response_class
+from app.core.init_db import (
+    create_first_superuser, get_async_session_context,
+)
+from app.core.password import password_pool
+from app.services.open_pool import open_pool_index
 
 app = FastAPI(
     title=settings.app_title,
     description=settings.app_description,
+    default_response_class=response_class(),
 )
 
 app.include_router(main_router)
 
 
+async def add_db_stats_headers(request: Request, call_next):
+    # Отладочные счётчики запросов к базе, в production выключены.
+    stats = DBStats()
+    token = db_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        db_stats.reset(token)
+    response.headers['X-DB-Commits'] = str(stats.commits)
+    response.headers['X-DB-Statements'] = str(stats.statements)
+    return response
+
+
+if settings.query_stats_headers:
+    app.middleware('http')(add_db_stats_headers)
+
+
 @app.on_event('startup')
 async def startup():
     await create_first_superuser()
+    if open_pool_index.enabled:
+        async with get_async_session_context() as session:
+            await open_pool_index.warm(session)
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    password_pool.shutdown()
@@ -1,6 +1,7 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, Boolean
+from sqlalchemy import Column, DateTime, Index, Integer, Boolean, text
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 from ..constants import DEFAULT_INVESTMENT_AMOUNT
@@ -14,5 +15,21 @@ class BaseModel(Base):
     invested_amount = Column(Integer, default=DEFAULT_INVESTMENT_AMOUNT)
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime(timezone=True),
-                         default=lambda: datetime.now())
-    close_date = Column(DateTime(timezone=True), nullable=True)
+                         default=lambda: datetime.now(), index=True)
+    close_date = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    @declared_attr
+    def __table_args__(cls):
+        # Частичный покрывающий индекс только по открытым строкам:
+        # запрос открытого пула читает его диапазоном в порядке FIFO.
+        # fully_invested нужен в колонках индекса, иначе SQLite читает
+        # строку таблицы, чтобы проверить условие WHERE.
+        return (
+            Index(
+                f'ix_{cls.__tablename__}_open_fifo',
+                'create_date', 'id', 'full_amount', 'invested_amount',
+                'fully_invested',
+                sqlite_where=text('fully_invested = 0'),
+                postgresql_where=text('fully_invested = false'),
+            ),
+        )
@@ -5,5 +5,5 @@ from .base import BaseModel
 
 class Donation(BaseModel):
     __tablename__ = 'donation'
-    user_id = Column(Integer, ForeignKey('user.id'))
+    user_id = Column(Integer, ForeignKey('user.id'), index=True)
     comment = Column(Text)
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from app.core.db import Base
+
+
+class Investment(Base):
+    donation_id = Column(Integer, ForeignKey('donation.id'), nullable=False)
+    charity_project_id = Column(
+        Integer, ForeignKey('charityproject.id'), nullable=False,
+    )
+    amount = Column(Integer, nullable=False)
+    create_date = Column(DateTime(timezone=True),
+                         default=lambda: datetime.now())
+
+    __table_args__ = (
+        Index(
+            'ix_investment_charity_project_id_id',
+            'charity_project_id', 'id', 'donation_id', 'amount',
+            'create_date',
+        ),
+        Index(
+            'ix_investment_donation_id_id',
+            'donation_id', 'id', 'charity_project_id', 'amount',
+            'create_date',
+        ),
+    )
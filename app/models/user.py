@@ -1,7 +1,13 @@
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
+from sqlalchemy import Index, func
 
 from app.core.db import Base
 
 
 class User(SQLAlchemyBaseUserTable[int], Base):
     pass
+
+
+# fastapi-users ищет email без учёта регистра: по lower(email) поиск и
+# отсев существующих при импорте идут диапазоном по индексу.
+Index('ix_user_email_lower', func.lower(User.email))
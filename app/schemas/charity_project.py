@@ -1,12 +1,13 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, Extra, Field, PositiveInt
+from pydantic import BaseModel, Extra, Field, PositiveInt, conlist
 
 from app.constants import (
     MIN_NAME_LENGTH,
     MAX_NAME_LENGTH,
     MIN_DESCRIPTION_LENGTH,
+    MAX_PROJECT_BATCH_SIZE,
 )
 
 
@@ -36,6 +37,11 @@ class CharityProjectCreate(CharityProjectBase):
     full_amount: PositiveInt
 
 
+CharityProjectBatch = conlist(
+    CharityProjectCreate, min_items=1, max_items=MAX_PROJECT_BATCH_SIZE,
+)
+
+
 class CharityProjectUpdate(CharityProjectBase):
 
     class Config:
@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, PositiveInt
+from pydantic import BaseModel, PositiveInt, conlist
+
+from app.constants import MAX_DONATION_BATCH_SIZE
 
 
 class DonationCreate(BaseModel):
@@ -9,6 +11,15 @@ class DonationCreate(BaseModel):
     comment: Optional[str]
 
 
+class DonationBatchItem(DonationCreate):
+    user_id: Optional[int]
+
+
+DonationBatch = conlist(
+    DonationBatchItem, min_items=1, max_items=MAX_DONATION_BATCH_SIZE,
+)
+
+
 class DonationDB(DonationCreate):
     id: int
     create_date: Optional[datetime]
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class InvestmentDB(BaseModel):
+    id: int
+    donation_id: int
+    charity_project_id: int
+    amount: int
+    create_date: Optional[datetime]
+
+    class Config:
+        orm_mode = True
@@ -1,4 +1,7 @@
+from typing import Optional
+
 from fastapi_users import schemas
+from pydantic import BaseModel
 
 
 class UserRead(schemas.BaseUser[int]):
@@ -11,3 +14,25 @@ class UserCreate(schemas.BaseUserCreate):
 
 class UserUpdate(schemas.BaseUserUpdate):
     pass
+
+
+class UserImportError(BaseModel):
+    row: int
+    detail: str
+    email: Optional[str]
+
+    class Config:
+        orm_mode = True
+
+
+class UserImportReport(BaseModel):
+    rows: int
+    created: int
+    skipped: int
+    failed: int
+    elapsed: float
+    rows_per_second: float
+    errors: list[UserImportError]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,59 @@
+"""Ядро FIFO-распределения средств.
+
+Работает только с массивами остатков и не зависит от ORM, поэтому
+пригодно и для офлайн-симуляций. NumPy используется, если установлен.
+"""
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class AllocationPlan(NamedTuple):
+    """План распределения суммы по открытым записям.
+
+    Записи с индексами ``[0, closed_count)`` закрываются полностью,
+    записи с индексом ``closed_count`` достаётся ``partial_amount``.
+    """
+    closed_count: int
+    partial_amount: int
+    absorbed: int
+    incoming_closed: bool
+
+    def iter_transfers(
+        self,
+        remaining: Sequence[int],
+    ) -> Iterator[tuple[int, int]]:
+        for index in range(self.closed_count):
+            yield index, int(remaining[index])
+        if self.partial_amount:
+            yield self.closed_count, self.partial_amount
+
+
+def amounts_array(values: Iterable[int]) -> array:
+    return array('q', values)
+
+
+def plan_allocation(
+    need: int,
+    remaining: Sequence[int],
+) -> AllocationPlan:
+    if not len(remaining):
+        return AllocationPlan(0, 0, 0, False)
+    if np is not None:
+        totals = np.cumsum(np.asarray(remaining, dtype=np.int64))
+        cut = int(np.searchsorted(totals, need, side='left'))
+    else:
+        totals = amounts_array(accumulate(remaining))
+        cut = bisect_left(totals, need)
+    if cut == len(totals):
+        return AllocationPlan(cut, 0, int(totals[-1]), False)
+    if totals[cut] == need:
+        return AllocationPlan(cut + 1, 0, need, True)
+    covered = int(totals[cut - 1]) if cut else 0
+    return AllocationPlan(cut, need - covered, need, True)
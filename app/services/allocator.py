@@ -0,0 +1,226 @@
+"""Последовательное выполнение всех изменений открытого пула.
+
+Одновременные запросы читают одни и те же открытые записи, поэтому
+распределение средств выполняется строго по очереди: «ход» — это
+``asyncio.Lock``, который выдаётся ожидающим в порядке поступления,
+а обработчик выполняет свою транзакцию, пока его держит.
+
+Если задан ``ALLOCATION_LOCK_PATH``, на время хода дополнительно берётся
+файловая блокировка, общая для всех воркеров на машине.
+"""
+import asyncio
+import contextlib
+import time
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar,
+)
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+T = TypeVar('T')
+
+
+class InterProcessLock:
+    """Эксклюзивная блокировка файла для процессов одной машины.
+
+    Блокировку держит ОС: если процесс-владелец упал, она снимается сама
+    и ход переходит к следующему воркеру.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float = 0.001,
+        max_poll_interval: float = 0.05,
+    ) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        if self._file is None:
+            self._file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(
+                    self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB,
+                )
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def release(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    async def acquire(self) -> None:
+        delay = self.poll_interval
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    @contextlib.asynccontextmanager
+    async def hold(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AllocationEngine:
+
+    def __init__(self) -> None:
+        self._loop = None
+        self._lock = None
+        self._process_lock: Optional[InterProcessLock] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Lock привязан к циклу событий, а их в процессе может быть
+        # несколько (например, в тестах).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        return self._lock
+
+    @contextlib.asynccontextmanager
+    async def turn(self) -> AsyncIterator[None]:
+        if not settings.allocation_serialized:
+            yield
+            return
+        async with self._get_lock(), self._hold_process_lock():
+            yield
+
+    @contextlib.asynccontextmanager
+    async def _hold_process_lock(self) -> AsyncIterator[None]:
+        path = settings.allocation_lock_path
+        if path is None:
+            yield
+            return
+        if self._process_lock is None or self._process_lock.path != path:
+            self._process_lock = InterProcessLock(path)
+        async with self._process_lock.hold():
+            yield
+
+    async def run(self, job: Callable[[], Awaitable[T]]) -> T:
+        async with self.turn():
+            return await job()
+
+
+class MicroBatcher:
+    """Group commit: элементы, пришедшие за одно окно, обрабатываются пачкой.
+
+    Пачка выполняется в собственной сессии на том же движке, что и сессия
+    вызывающего, и каждый вызывающий получает свой результат. Если пачка
+    падает, элементы повторяются по одному, чтобы ошибка досталась только
+    виновнику. Размер пачки и время ожидания пишутся в метрики
+    ``<name>.size`` и ``<name>.wait_ms``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[list[Any], AsyncSession], Awaitable[list[Any]]],
+    ) -> None:
+        self.name = name
+        self._process = process
+        self._loop = None
+        self._pending = []
+        self._bind = None
+        self._timer = None
+        # Цикл событий держит задачи слабыми ссылками.
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        item: Any,
+        session: AsyncSession,
+        window_ms: float,
+        max_size: int,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._pending, self._timer = loop, [], None
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) == 1:
+            self._bind = session.bind
+            self._timer = loop.call_later(window_ms / 1000, self._flush)
+        if len(self._pending) >= max_size:
+            self._flush()
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run(batch, self._bind))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _call(self, items: list[Any], bind: Any) -> list[Any]:
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            return await self._process(items, session)
+
+    async def _run(self, batch: list[tuple], bind: Any) -> None:
+        started = time.perf_counter()
+        metrics.observe(f'{self.name}.size', len(batch))
+        for _, _, submitted in batch:
+            metrics.observe(
+                f'{self.name}.wait_ms', (started - submitted) * 1000,
+            )
+        try:
+            results = await self._call(
+                [item for item, _, _ in batch], bind,
+            )
+        except Exception as error:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], error=error)
+                return
+            metrics.increment(f'{self.name}.split')
+            for item, future, _ in batch:
+                if future.done():
+                    continue
+                try:
+                    result, = await self._call([item], bind)
+                except Exception as item_error:
+                    self._resolve(future, error=item_error)
+                else:
+                    self._resolve(future, result)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(
+        future: asyncio.Future,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+allocation_engine = AllocationEngine()
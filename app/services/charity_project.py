@@ -1,16 +1,29 @@
+import csv
+from collections import Counter
+from functools import partial
 from http import HTTPStatus
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
 
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.utils import get_project_or_404
+from app.constants import EXPORT_CHUNK_SIZE, MAX_PROJECT_BATCH_SIZE
+from app.core.cache import cache
+from app.core.db import after_commit, unit_of_work
 from app.crud.charity_project import charity_project_crud
 from app.models import CharityProject, Donation
 from app.schemas.charity_project import (
     CharityProjectCreate,
+    CharityProjectDB,
     CharityProjectUpdate,
 )
-from app.services.investment import donation_process
+from app.services.allocator import allocation_engine
+from app.services.investment import allocate, donation_process
+from app.services.open_pool import open_pool_index
+
+PROJECT_COLUMNS = tuple(CharityProjectDB.__fields__)
 
 
 class CharityProjectService:
@@ -29,6 +42,33 @@ class CharityProjectService:
                 detail='Проект с таким именем уже существует.',
             )
 
+    async def check_project_names(
+        self,
+        project_names: list[str],
+        session: AsyncSession,
+    ) -> None:
+        repeated = sorted(
+            name for name, count in Counter(project_names).items()
+            if count > 1
+        )
+        if repeated:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Имена проектов повторяются: {}.'.format(
+                    ', '.join(repeated)
+                ),
+            )
+        existing = await charity_project_crud.get_existing_names(
+            project_names, session,
+        )
+        if existing:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Проекты с такими именами уже существуют: {}.'.format(
+                    ', '.join(existing)
+                ),
+            )
+
     def check_project_activeness(
         self,
         charity_project: CharityProject,
@@ -60,76 +100,145 @@ class CharityProjectService:
                 detail='Нельзя установить сумму, меньшую вложенной.',
             )
 
+    def invalidate_cache(self, session: AsyncSession) -> None:
+        after_commit(session, partial(
+            cache.bump, CharityProject.__tablename__,
+        ))
+
     async def create_project(
         self,
         project: CharityProjectCreate,
         session: AsyncSession,
     ) -> CharityProject:
-        await self.check_project_name(
-            project.name, session,
-        )
-        new_project = await charity_project_crud.create_project(
-            project, session,
-        )
-        new_project = await donation_process(
-            new_project, Donation, session,
-        )
-        await session.commit()
-        await session.refresh(new_project)
+        async with allocation_engine.turn(), unit_of_work(session):
+            await self.check_project_name(
+                project.name, session,
+            )
+            new_project = await charity_project_crud.create_project(
+                project, session,
+            )
+            new_project = await donation_process(
+                new_project, Donation, session,
+            )
+            self.invalidate_cache(session)
         return new_project
 
+    async def create_projects(
+        self,
+        projects: list[CharityProjectCreate],
+        session: AsyncSession,
+    ) -> list[CharityProject]:
+        """Пакетное создание с одним FIFO-проходом по пожертвованиям.
+
+        Результат совпадает с созданием проектов по одному в том же
+        порядке.
+        """
+        async with allocation_engine.turn(), unit_of_work(session):
+            await self.check_project_names(
+                [project.name for project in projects], session,
+            )
+            new_projects = await charity_project_crud.bulk_create_projects(
+                projects, session,
+            )
+            await allocate(new_projects, Donation, session)
+            self.invalidate_cache(session)
+        return new_projects
+
+    def read_projects_csv(
+        self,
+        lines: Iterable[str],
+    ) -> list[CharityProjectCreate]:
+        """Проекты из CSV с колонками name, description, full_amount."""
+        projects, errors = [], []
+        for number, record in enumerate(csv.DictReader(lines), 1):
+            try:
+                projects.append(CharityProjectCreate(**{
+                    key: value for key, value in record.items()
+                    if key is not None and value != ''
+                }))
+            except ValidationError as error:
+                errors.extend(
+                    {'row': number, **item} for item in error.errors()
+                )
+        if errors:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=errors,
+            )
+        if not 0 < len(projects) <= MAX_PROJECT_BATCH_SIZE:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=(
+                    'В файле должно быть от 1 до '
+                    f'{MAX_PROJECT_BATCH_SIZE} проектов.'
+                ),
+            )
+        return projects
+
     async def update_project(
         self,
         project: CharityProject,
         obj_in: CharityProjectUpdate,
         session: AsyncSession,
     ) -> CharityProject:
-        project = await get_project_or_404(
-            project.id, session,
-        )
-        self.check_project_activeness(project)
-        if obj_in.name:
-            await self.check_project_name(
-                obj_in.name, session,
-            )
-        if not obj_in.full_amount:
+        async with allocation_engine.turn(), unit_of_work(session):
+            await session.refresh(project)
+            self.check_project_activeness(project)
+            if obj_in.name:
+                await self.check_project_name(
+                    obj_in.name, session,
+                )
+            if obj_in.full_amount:
+                self.check_amount_update(
+                    obj_in.full_amount, project.invested_amount,
+                )
             project = await charity_project_crud.update_project(
                 project, obj_in, session,
             )
-            await session.commit()
-            await session.refresh(project)
-            return project
-        self.check_amount_update(
-            obj_in.full_amount, project.invested_amount,
-        )
-        charity_project = await charity_project_crud.update_project(
-            project, obj_in, session,
-        )
-        charity_project = await donation_process(
-            project, Donation, session,
-        )
-        await session.commit()
-        await session.refresh(charity_project)
-        return charity_project
+            if obj_in.full_amount:
+                project = await donation_process(
+                    project, Donation, session,
+                )
+            self.invalidate_cache(session)
+        return project
 
     async def remove_project(
         self,
         project: CharityProject,
         session: AsyncSession,
     ) -> CharityProject:
-        project = await get_project_or_404(
-            project.id, session,
-        )
-        self.check_project_investment(project)
-        project = await charity_project_crud.remove_project(
-            project, session,
-        )
-        await session.commit()
+        async with allocation_engine.turn(), unit_of_work(session):
+            await session.refresh(project)
+            self.check_project_investment(project)
+            project = await charity_project_crud.remove_project(
+                project, session,
+            )
+            after_commit(session, partial(
+                open_pool_index.discard, CharityProject, project.id,
+            ))
+            self.invalidate_cache(session)
         return project
 
     async def get_all_projects(
         self,
-        session: AsyncSession
-    ) -> list[CharityProject]:
-        projects = await charity_project_crud.get_multi(session)
+        session: AsyncSession,
+        limit: Optional[int] = None,
+        after: Optional[int] = None,
+        columns: Sequence[str] = PROJECT_COLUMNS,
+    ) -> list[Row]:
+        projects = await charity_project_crud.get_page(
+            session, limit, after, columns,
+        )
         return projects
+
+    def stream_projects(
+        self,
+        session: AsyncSession,
+        *criteria: Any,
+        order_by: Sequence[Any] = (),
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list[Row]]:
+        return charity_project_crud.stream_chunks(
+            session, PROJECT_COLUMNS, *criteria,
+            order_by=order_by, chunk_size=chunk_size,
+        )
@@ -0,0 +1,217 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy.engine import Row
+from starlette.responses import StreamingResponse
+
+from app.constants import EXPORT_CHUNK_SIZE, PARQUET_ROW_GROUP_SIZE
+from app.core.encoders import dumps
+from app.models.base import BaseModel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+class StreamFormat(str, Enum):
+    ndjson = 'ndjson'
+    json = 'json'
+
+
+MEDIA_TYPES = {
+    StreamFormat.ndjson: 'application/x-ndjson',
+    StreamFormat.json: 'application/json',
+}
+
+
+def encode_row(row: Row) -> bytes:
+    """Строка таблицы в JSON без пустых полей, как в ответах списков."""
+    return dumps({
+        key: value for key, value in row._mapping.items()
+        if value is not None
+    })
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[list[Row]],
+) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        yield b''.join(encode_row(row) + b'\n' for row in chunk)
+
+
+async def iter_json_array(
+    chunks: AsyncIterator[list[Row]],
+) -> AsyncIterator[bytes]:
+    yield b'['
+    separator = b''
+    async for chunk in chunks:
+        if chunk:
+            yield separator + b','.join(encode_row(row) for row in chunk)
+            separator = b','
+    yield b']'
+
+
+def stream_rows(
+    chunks: AsyncIterator[list[Row]],
+    stream_format: StreamFormat,
+) -> StreamingResponse:
+    """Потоковый ответ: строки кодируются по одной по мере чтения порций.
+
+    Первый байт уходит сразу, а память ограничена одной порцией
+    независимо от размера таблицы.
+    """
+    if stream_format is StreamFormat.ndjson:
+        body = iter_ndjson(chunks)
+    else:
+        body = iter_json_array(chunks)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[stream_format])
+
+
+class ExportFormat(str, Enum):
+    csv = 'csv'
+    parquet = 'parquet'
+
+    @property
+    def chunk_size(self) -> int:
+        # Для Parquet каждая порция становится отдельной группой строк.
+        if self is ExportFormat.parquet:
+            return PARQUET_ROW_GROUP_SIZE
+        return EXPORT_CHUNK_SIZE
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.csv: 'text/csv; charset=utf-8',
+    ExportFormat.parquet: 'application/vnd.apache.parquet',
+}
+
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def check_export_format(export_format: ExportFormat) -> None:
+    if export_format is ExportFormat.parquet and pa is None:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Экспорт в Parquet недоступен: не установлен pyarrow.',
+        )
+
+
+def csv_cell(value: Any) -> Any:
+    """Ячейка CSV, которую табличный редактор не примет за формулу."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def iter_csv(
+    columns: Sequence[str],
+    chunks: AsyncIterator[list[Row]],
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(map(csv_cell, row) for row in chunk)
+        yield buffer.getvalue().encode()
+
+
+class ParquetSink:
+    """Файл для ParquetWriter, отдающий записанные байты по частям.
+
+    Позиция считается от начала файла, поэтому смещения в метаданных
+    Parquet остаются верными, хотя сами байты уже отправлены клиенту.
+    """
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+PARQUET_TYPES = {
+    bool: 'bool_',
+    int: 'int64',
+    str: 'string',
+}
+
+
+def parquet_schema(model: BaseModel, columns: Sequence[str]) -> 'pa.Schema':
+    fields = []
+    for column in columns:
+        python_type = model.__table__.c[column].type.python_type
+        if python_type is datetime:
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = getattr(pa, PARQUET_TYPES[python_type])()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields)
+
+
+async def iter_parquet(
+    schema: 'pa.Schema',
+    chunks: AsyncIterator[list[Row]],
+) -> AsyncIterator[bytes]:
+    sink = ParquetSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    try:
+        async for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(
+                [dict(row._mapping) for row in chunk], schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_rows(
+    model: BaseModel,
+    columns: Sequence[str],
+    chunks: AsyncIterator[list[Row]],
+    export_format: ExportFormat,
+) -> StreamingResponse:
+    """Потоковая выгрузка строк в CSV или Parquet.
+
+    Порции читаются из курсора по мере отправки, поэтому память
+    не зависит от размера выгрузки.
+    """
+    check_export_format(export_format)
+    if export_format is ExportFormat.csv:
+        body = iter_csv(columns, chunks)
+    else:
+        body = iter_parquet(parquet_schema(model, columns), chunks)
+    filename = f'{model.__tablename__}.{export_format.value}'
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
@@ -1,9 +1,150 @@
 from datetime import datetime
+from functools import partial
+from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cache
+from app.core.db import after_commit
+from app.crud.base import CRUDBase
+from app.crud.investment import investment_crud
+from app.models import Donation
 from app.models.base import BaseModel
+from app.services.allocation import (
+    AllocationPlan, amounts_array, plan_allocation,
+)
+from app.services.open_pool import PoolSide, open_pool_index
+
+
+class OpenPool:
+    """Курсор по открытому пулу: порции читаются по мере необходимости.
+
+    Изменения копятся в ``updates`` и записываются одним bulk_update,
+    поэтому чтение следующих порций видит исходное состояние таблицы.
+    Каждое перемещение средств попадает в ``transfers`` для журнала
+    вложений. Если передан ``side`` индекса открытого пула, база не
+    читается.
+    """
+
+    def __init__(
+        self,
+        model_db: BaseModel,
+        session: AsyncSession,
+        close_date: datetime,
+        side: Optional[PoolSide] = None,
+    ) -> None:
+        self.model_db = model_db
+        self.close_date = close_date
+        self.updates: dict[int, dict[str, Any]] = {}
+        self.transfers: list[dict[str, Any]] = []
+        if side is not None:
+            self._chunks = side.iter_chunks()
+        else:
+            self._chunks = CRUDBase(model_db).iter_open_chunks(session)
+        self._rows: list[Row] = []
+        self._remaining = amounts_array(())
+        self._offset = 0
+        self._exhausted = False
+
+    async def has_open(self) -> bool:
+        while self._offset >= len(self._rows):
+            if self._exhausted:
+                return False
+            try:
+                self._rows = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+                return False
+            self._remaining = amounts_array(
+                row.full_amount - row.invested_amount for row in self._rows
+            )
+            self._offset = 0
+        return True
+
+    def invest(self, obj_in: BaseModel) -> BaseModel:
+        remaining = self._remaining[self._offset:]
+        plan = plan_allocation(
+            obj_in.full_amount - obj_in.invested_amount, remaining,
+        )
+        for index, amount in plan.iter_transfers(remaining):
+            if amount:
+                self.transfers.append(self._transfer(
+                    obj_in, self._rows[self._offset + index].id, amount,
+                ))
+        for row in self._rows[self._offset:self._offset + plan.closed_count]:
+            self.updates[row.id] = {
+                'id': row.id,
+                'invested_amount': row.full_amount,
+                'fully_invested': True,
+                'close_date': self.close_date,
+            }
+        self._offset += plan.closed_count
+        if plan.partial_amount:
+            row = self._rows[self._offset]
+            self._remaining[self._offset] -= plan.partial_amount
+            self.updates[row.id] = {
+                'id': row.id,
+                'invested_amount': (
+                    row.full_amount - self._remaining[self._offset]
+                ),
+                'fully_invested': False,
+                'close_date': None,
+            }
+        return apply_plan(obj_in, plan, self.close_date)
+
+    def _transfer(
+        self,
+        obj_in: BaseModel,
+        source_id: int,
+        amount: int,
+    ) -> dict[str, Any]:
+        if isinstance(obj_in, Donation):
+            donation_id, charity_project_id = obj_in.id, source_id
+        else:
+            donation_id, charity_project_id = source_id, obj_in.id
+        return {
+            'donation_id': donation_id,
+            'charity_project_id': charity_project_id,
+            'amount': amount,
+            'create_date': self.close_date,
+        }
+
+    async def save(self, session: AsyncSession) -> None:
+        await self._chunks.aclose()
+        await CRUDBase(self.model_db).bulk_update(
+            list(self.updates.values()), session,
+        )
+        await investment_crud.bulk_create(self.transfers, session)
+
+
+async def allocate(
+    objs_in: list[BaseModel],
+    model_db: BaseModel,
+    session: AsyncSession,
+) -> list[BaseModel]:
+    """Один FIFO-проход по открытому пулу для нескольких объектов.
+
+    Результат совпадает с последовательной обработкой ``objs_in``.
+    """
+    side = open_pool_index.side(model_db)
+    pool = OpenPool(model_db, session, datetime.now(), side)
+    if side is None or len(side):
+        for obj_in in objs_in:
+            while not obj_in.fully_invested and await pool.has_open():
+                pool.invest(obj_in)
+    await pool.save(session)
+    session.add_all(objs_in)
+    after_commit(session, partial(
+        cache.bump,
+        model_db.__tablename__,
+        *{obj_in.__tablename__ for obj_in in objs_in},
+    ))
+    if open_pool_index.ready:
+        after_commit(session, partial(
+            open_pool_index.sync, model_db, pool.updates.values(), objs_in,
+        ))
+    return objs_in
 
 
 async def donation_process(
@@ -11,44 +152,26 @@ async def donation_process(
     model_db: BaseModel,
     session: AsyncSession
 ) -> BaseModel:
-    source_db_all = (await session.execute(
-        select(model_db).where(
-            model_db.fully_invested == False  # noqa
-        ).order_by(model_db.create_date)
-    )).scalars().all()
-
-    for source_db in source_db_all:
-        obj_in, source_db = await money_distribution(obj_in, source_db)
-        session.add(obj_in)
-        session.add(source_db)
-
-    await session.commit()
-    await session.refresh(obj_in)
+    await allocate([obj_in], model_db, session)
     return obj_in
 
 
-def close_entity(obj_db: BaseModel) -> BaseModel:
+def close_entity(
+    obj_db: BaseModel,
+    close_date: Optional[datetime] = None,
+) -> BaseModel:
     obj_db.invested_amount = obj_db.full_amount
     obj_db.fully_invested = True
-    obj_db.close_date = datetime.now()
+    obj_db.close_date = close_date or datetime.now()
     return obj_db
 
 
-async def money_distribution(
+def apply_plan(
     obj_in: BaseModel,
-    obj_db: BaseModel,
-) -> tuple[BaseModel, BaseModel]:
-    rem_obj_in = obj_in.full_amount - obj_in.invested_amount
-    rem_obj_db = obj_db.full_amount - obj_db.invested_amount
-
-    if rem_obj_in > rem_obj_db:
-        obj_in.invested_amount += rem_obj_db
-        obj_db = close_entity(obj_db)
-    elif rem_obj_in == rem_obj_db:
-        obj_in = close_entity(obj_in)
-        obj_db = close_entity(obj_db)
-    else:
-        obj_db.invested_amount += rem_obj_in
-        obj_in = close_entity(obj_in)
-
-    return obj_in, obj_db
+    plan: AllocationPlan,
+    close_date: Optional[datetime] = None,
+) -> BaseModel:
+    if plan.incoming_closed:
+        return close_entity(obj_in, close_date)
+    obj_in.invested_amount += plan.absorbed
+    return obj_in
@@ -0,0 +1,178 @@
+"""Индекс открытых проектов и пожертвований в памяти процесса.
+
+Строится при старте приложения и обновляется путём распределения после
+каждого успешного commit, поэтому распределению не нужен читающий
+запрос к базе. Работает только в одном процессе (``SINGLE_PROCESS``)
+с последовательным распределением (``ALLOCATION_SERIALIZED``), иначе
+индекс не включается.
+"""
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import ALLOCATION_CHUNK_SIZE
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.models import CharityProject, Donation
+from app.models.base import BaseModel
+
+
+class PoolEntry:
+    __slots__ = (
+        'id', 'create_date', 'full_amount', 'invested_amount', 'removed',
+    )
+
+    def __init__(
+        self,
+        id: int,
+        create_date: Optional[datetime],
+        full_amount: int,
+        invested_amount: int,
+    ) -> None:
+        self.id = id
+        self.create_date = create_date
+        self.full_amount = full_amount
+        self.invested_amount = invested_amount
+        self.removed = False
+
+
+class PoolSide:
+    """Открытые записи одной таблицы в порядке FIFO."""
+
+    def __init__(self) -> None:
+        self._queue: deque[PoolEntry] = deque()
+        self._entries: dict[int, PoolEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def upsert(self, obj: Any) -> None:
+        entry = self._entries.get(obj.id)
+        if entry is not None:
+            entry.full_amount = obj.full_amount
+            entry.invested_amount = obj.invested_amount
+            return
+        entry = PoolEntry(
+            obj.id, obj.create_date, obj.full_amount, obj.invested_amount,
+        )
+        self._entries[entry.id] = entry
+        self._queue.append(entry)
+
+    def discard(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is not None:
+            entry.removed = True
+        while self._queue and self._queue[0].removed:
+            self._queue.popleft()
+
+    def apply_updates(self, updates: Iterable[dict[str, Any]]) -> None:
+        for values in updates:
+            if values['fully_invested']:
+                self.discard(values['id'])
+            else:
+                self._entries[values['id']].invested_amount = (
+                    values['invested_amount']
+                )
+
+    async def iter_chunks(
+        self,
+        chunk_size: int = ALLOCATION_CHUNK_SIZE,
+    ) -> AsyncIterator[list[PoolEntry]]:
+        chunk = []
+        # Очередь меняют только sync и discard в after_commit, внутри того
+        # же хода распределения и уже после того, как обход закончен,
+        # поэтому копировать её не нужно.
+        for entry in self._queue:
+            if entry.removed:
+                continue
+            chunk.append(entry)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def snapshot(self) -> dict[int, tuple[int, int]]:
+        return {
+            entry.id: (entry.full_amount, entry.invested_amount)
+            for entry in self._entries.values()
+        }
+
+
+class OpenPoolIndex:
+
+    models = (CharityProject, Donation)
+
+    def __init__(self) -> None:
+        self.sides: dict[str, PoolSide] = {}
+        self.ready = False
+
+    @property
+    def enabled(self) -> bool:
+        return (
+            settings.open_pool_index and
+            settings.single_process and
+            settings.allocation_serialized
+        )
+
+    def side(self, model_db: BaseModel) -> Optional[PoolSide]:
+        if not self.ready:
+            return None
+        return self.sides[model_db.__tablename__]
+
+    async def warm(self, session: AsyncSession) -> None:
+        self.ready = False
+        sides = {}
+        for model in self.models:
+            side = sides[model.__tablename__] = PoolSide()
+            async for chunk in CRUDBase(model).iter_open_chunks(session):
+                for row in chunk:
+                    side.upsert(row)
+        self.sides = sides
+        self.ready = True
+
+    def sync(
+        self,
+        model_db: BaseModel,
+        updates: Iterable[dict[str, Any]],
+        objs_in: Iterable[BaseModel],
+    ) -> None:
+        if not self.ready:
+            return
+        self.side(model_db).apply_updates(updates)
+        for obj_in in objs_in:
+            side = self.side(type(obj_in))
+            if obj_in.fully_invested:
+                side.discard(obj_in.id)
+            else:
+                side.upsert(obj_in)
+
+    def discard(self, model: BaseModel, entry_id: int) -> None:
+        if self.ready:
+            self.side(model).discard(entry_id)
+
+    async def verify(self, session: AsyncSession) -> dict[str, Any]:
+        """Сверка индекса с базой: расхождения по каждой таблице."""
+        report = {'ready': self.ready}
+        if not self.ready:
+            return report
+        for model in self.models:
+            indexed = self.side(model).snapshot()
+            actual = {}
+            async for chunk in CRUDBase(model).iter_open_chunks(session):
+                for row in chunk:
+                    actual[row.id] = (row.full_amount, row.invested_amount)
+            report[model.__tablename__] = {
+                'missing': sorted(actual.keys() - indexed.keys()),
+                'extra': sorted(indexed.keys() - actual.keys()),
+                'stale': sorted(
+                    entry_id for entry_id in actual.keys() & indexed.keys()
+                    if actual[entry_id] != indexed[entry_id]
+                ),
+            }
+        return report
+
+
+open_pool_index = OpenPoolIndex()
@@ -0,0 +1,226 @@
+"""Полный пересчёт распределения средств по данным в базе.
+
+Проекты и пожертвования проигрываются в общем порядке create_date, как
+если бы поступали заново. Строки читаются порциями, открытый пул
+хранится в компактных массивах, результаты пишутся пачками. В памяти
+держится только открытый пул, а не вся таблица.
+"""
+import time
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import ALLOCATION_CHUNK_SIZE
+from app.crud.base import CRUDBase
+from app.crud.investment import investment_crud
+from app.models import CharityProject, Donation, Investment
+from app.models.base import BaseModel
+from app.services.allocation import plan_allocation
+
+REPLAY_COLUMNS = (
+    'id', 'full_amount', 'invested_amount', 'fully_invested',
+    'close_date', 'create_date',
+)
+
+
+@dataclass
+class ReplayReport:
+    rows: int = 0
+    changed: int = 0
+    transfers: int = 0
+    elapsed: float = 0
+    diffs: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0
+
+
+class ReplayPool:
+    """Открытые записи одной стороны в порядке FIFO."""
+
+    def __init__(self) -> None:
+        self.model: Optional[BaseModel] = None
+        self.ids = array('q')
+        self.remaining = array('q')
+        self.rows: dict[int, Row] = {}
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.head
+
+    def push(self, model: BaseModel, row: Row, remaining: int) -> None:
+        self.model = model
+        self.ids.append(row.id)
+        self.remaining.append(remaining)
+        self.rows[row.id] = row
+
+    def compact(self) -> None:
+        if self.head and self.head * 2 >= len(self.ids):
+            del self.ids[:self.head]
+            del self.remaining[:self.head]
+            self.head = 0
+
+
+class Replay:
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        dry_run: bool = False,
+        chunk_size: int = ALLOCATION_CHUNK_SIZE,
+        max_diffs: int = 20,
+    ) -> None:
+        self.session = session
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.max_diffs = max_diffs
+        self.report = ReplayReport()
+        self.pool = ReplayPool()
+        self.updates: dict[BaseModel, list[dict[str, Any]]] = {
+            CharityProject: [], Donation: [],
+        }
+        self.transfers: list[dict[str, Any]] = []
+
+    async def run(self) -> ReplayReport:
+        started = time.perf_counter()
+        if not self.dry_run:
+            await self.session.execute(delete(Investment))
+        projects = self._iter_rows(CharityProject)
+        donations = self._iter_rows(Donation)
+        project = await anext_or_none(projects)
+        donation = await anext_or_none(donations)
+        while project is not None or donation is not None:
+            if donation is None or (
+                project is not None and
+                (project.create_date, project.id) <=
+                (donation.create_date, donation.id)
+            ):
+                await self._arrive(CharityProject, project)
+                project = await anext_or_none(projects)
+            else:
+                await self._arrive(Donation, donation)
+                donation = await anext_or_none(donations)
+        pool = self.pool
+        for index in range(pool.head, len(pool.ids)):
+            row = pool.rows[pool.ids[index]]
+            await self._finish(
+                pool.model, row, row.full_amount - pool.remaining[index],
+                None,
+            )
+        await self._flush(force=True)
+        self.report.elapsed = time.perf_counter() - started
+        return self.report
+
+    async def _iter_rows(self, model: BaseModel) -> AsyncIterator[Row]:
+        async for chunk in CRUDBase(model).iter_fifo_chunks(
+            self.session, REPLAY_COLUMNS, chunk_size=self.chunk_size,
+        ):
+            for row in chunk:
+                yield row
+
+    async def _arrive(self, model: BaseModel, row: Row) -> None:
+        self.report.rows += 1
+        pool = self.pool
+        need, invested, closed = row.full_amount, 0, False
+        while pool.model is not model and len(pool) and not closed:
+            window = pool.remaining[pool.head:pool.head + self.chunk_size]
+            plan = plan_allocation(need - invested, window)
+            for index, amount in plan.iter_transfers(window):
+                if amount:
+                    self._transfer(
+                        model, row, pool.ids[pool.head + index], amount,
+                    )
+            for index in range(plan.closed_count):
+                source = pool.rows.pop(pool.ids[pool.head + index])
+                await self._finish(
+                    pool.model, source, source.full_amount, row.create_date,
+                )
+            pool.head += plan.closed_count
+            if plan.partial_amount:
+                pool.remaining[pool.head] -= plan.partial_amount
+            invested += plan.absorbed
+            closed = plan.incoming_closed
+        pool.compact()
+        if closed:
+            await self._finish(model, row, need, row.create_date)
+        else:
+            pool.push(model, row, need - invested)
+
+    def _transfer(
+        self,
+        model: BaseModel,
+        row: Row,
+        source_id: int,
+        amount: int,
+    ) -> None:
+        self.report.transfers += 1
+        if model is Donation:
+            donation_id, charity_project_id = row.id, source_id
+        else:
+            donation_id, charity_project_id = source_id, row.id
+        self.transfers.append({
+            'donation_id': donation_id,
+            'charity_project_id': charity_project_id,
+            'amount': amount,
+            'create_date': row.create_date,
+        })
+
+    async def _finish(
+        self,
+        model: BaseModel,
+        row: Row,
+        invested_amount: int,
+        close_date: Optional[datetime],
+    ) -> None:
+        fully_invested = close_date is not None
+        if fully_invested and row.fully_invested and row.close_date:
+            close_date = row.close_date
+        if (
+            row.invested_amount == invested_amount and
+            bool(row.fully_invested) == fully_invested and
+            (row.close_date is None) == (close_date is None)
+        ):
+            return
+        self.report.changed += 1
+        if len(self.report.diffs) < self.max_diffs:
+            self.report.diffs.append(
+                f'{model.__tablename__} {row.id}: '
+                f'invested_amount {row.invested_amount} -> '
+                f'{invested_amount}, fully_invested '
+                f'{row.fully_invested} -> {fully_invested}'
+            )
+        self.updates[model].append({
+            'id': row.id,
+            'invested_amount': invested_amount,
+            'fully_invested': fully_invested,
+            'close_date': close_date,
+        })
+        await self._flush()
+
+    async def _flush(self, force: bool = False) -> None:
+        for model, values in self.updates.items():
+            if values and (force or len(values) >= self.chunk_size):
+                if not self.dry_run:
+                    await CRUDBase(model).bulk_update(values, self.session)
+                values.clear()
+        if self.transfers and (
+            force or len(self.transfers) >= self.chunk_size
+        ):
+            if not self.dry_run:
+                await investment_crud.bulk_create(
+                    self.transfers, self.session,
+                )
+            self.transfers.clear()
+
+
+async def anext_or_none(rows: AsyncIterator[Row]) -> Optional[Row]:
+    try:
+        return await rows.__anext__()
+    except StopAsyncIteration:
+        return None
@@ -0,0 +1,274 @@
+"""Массовый импорт пользователей из CSV или NDJSON.
+
+Строки проверяются теми же правилами, что и регистрация, пароли
+хэшируются в потоках ``password_pool`` (скрипт импорта — в собственном
+пуле процессов), а пользователи вставляются пачками одним executemany.
+Уже существующие email пропускаются: они отсеиваются одним запросом на
+пачку, а гонку с параллельной регистрацией закрывает ``ON CONFLICT DO
+NOTHING`` по уникальному индексу или, в других СУБД, повтор пачки
+по одной строке.
+"""
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import (
+    Any, Awaitable, Callable, Iterable, Iterator, Optional, Union,
+)
+
+from fastapi_users import InvalidPasswordException
+from passlib.context import CryptContext
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import USER_IMPORT_BATCH_SIZE, USER_IMPORT_MAX_ERRORS
+from app.core.config import settings
+from app.core.db import unit_of_work
+from app.core.password import password_pool
+from app.core.user import CachedUserDatabase, UserManager
+from app.models.user import User
+from app.schemas.user import UserCreate
+
+UPSERT_DIALECTS = {'postgresql': postgresql, 'sqlite': sqlite}
+
+
+class ImportFormat(str, Enum):
+    csv = 'csv'
+    ndjson = 'ndjson'
+
+
+@dataclass
+class UserImportError:
+    row: int
+    detail: str
+    email: Optional[str] = None
+
+
+@dataclass
+class UserImportReport:
+    rows: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    elapsed: float = 0
+    errors: list[UserImportError] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0
+
+
+def read_records(
+    lines: Iterable[str],
+    import_format: ImportFormat,
+) -> Iterator[Union[dict[str, Any], ValueError]]:
+    """Записи файла; нечитаемая строка NDJSON заменяется ошибкой."""
+    if import_format is ImportFormat.csv:
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield error
+            continue
+        if not isinstance(record, dict):
+            record = ValueError('Ожидается JSON-объект.')
+        yield record
+
+
+def hash_passwords(rounds: int, passwords: list[str]) -> list[str]:
+    """Хэши bcrypt для части пачки; выполняется в процессе пула."""
+    context = CryptContext(schemes=['bcrypt'], bcrypt__rounds=rounds)
+    return [context.hash(password) for password in passwords]
+
+
+async def hash_in_processes(
+    executor: Executor,
+    workers: int,
+    passwords: list[str],
+) -> list[str]:
+    loop = asyncio.get_running_loop()
+    size = -(-len(passwords) // workers)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(
+            executor, hash_passwords,
+            settings.password_hash_rounds, passwords[start:start + size],
+        )
+        for start in range(0, len(passwords), size)
+    ))
+    return [hashed for part in parts for hashed in part]
+
+
+class UserImport:
+    """Импорт пачками: проверка, отсев существующих, хэши и вставка."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        hash_passwords: Callable[[list[str]], Awaitable[list[str]]],
+        batch_size: int = USER_IMPORT_BATCH_SIZE,
+        max_errors: int = USER_IMPORT_MAX_ERRORS,
+    ) -> None:
+        self.session = session
+        self.hash = hash_passwords
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.manager = UserManager(
+            CachedUserDatabase(session, User), password_pool.helper,
+        )
+        self.report = UserImportReport()
+        self._seen: set[str] = set()
+
+    async def run(
+        self,
+        records: Iterable[Union[dict[str, Any], ValueError]],
+    ) -> UserImportReport:
+        started = time.perf_counter()
+        batch: list[UserCreate] = []
+        for number, record in enumerate(records, 1):
+            self.report.rows += 1
+            user = await self.validate(number, record)
+            if user is None:
+                continue
+            batch.append(user)
+            if len(batch) >= self.batch_size:
+                await self.flush(batch)
+                batch = []
+        await self.flush(batch)
+        self.report.elapsed = time.perf_counter() - started
+        return self.report
+
+    def fail(self, row: int, detail: str, email: Optional[str] = None):
+        self.report.failed += 1
+        if len(self.report.errors) < self.max_errors:
+            self.report.errors.append(UserImportError(row, detail, email))
+
+    async def validate(
+        self,
+        number: int,
+        record: Union[dict[str, Any], ValueError],
+    ) -> Optional[UserCreate]:
+        if isinstance(record, ValueError):
+            self.fail(number, str(record))
+            return None
+        email = record.get('email')
+        try:
+            user = UserCreate(**{
+                key: value for key, value in record.items()
+                if key is not None and value not in ('', None)
+            })
+            await self.manager.validate_password(user.password, user)
+        except ValidationError as error:
+            self.fail(number, '; '.join(
+                f'{".".join(map(str, item["loc"]))}: {item["msg"]}'
+                for item in error.errors()
+            ), email)
+            return None
+        except InvalidPasswordException as error:
+            self.fail(number, error.reason, email)
+            return None
+        key = user.email.lower()
+        if key in self._seen:
+            self.fail(number, 'Email повторяется в файле.', email)
+            return None
+        self._seen.add(key)
+        return user
+
+    async def flush(self, batch: list[UserCreate]) -> None:
+        if not batch:
+            return
+        existing = await self.existing_emails(
+            [user.email.lower() for user in batch]
+        )
+        new_users = [
+            user for user in batch if user.email.lower() not in existing
+        ]
+        self.report.skipped += len(batch) - len(new_users)
+        if not new_users:
+            return
+        hashes = await self.hash([user.password for user in new_users])
+        values = []
+        for user, hashed_password in zip(new_users, hashes):
+            user_dict = user.create_update_dict_superuser()
+            user_dict.pop('password')
+            values.append(dict(user_dict, hashed_password=hashed_password))
+        created = await self.insert(values)
+        self.report.created += created
+        self.report.skipped += len(values) - created
+
+    async def existing_emails(self, emails: list[str]) -> set[str]:
+        return set((await self.session.execute(
+            select(func.lower(User.email)).where(
+                func.lower(User.email).in_(emails)
+            )
+        )).scalars())
+
+    async def insert(self, values: list[dict[str, Any]]) -> int:
+        """Вставка пачки; возвращает число созданных пользователей."""
+        dialect = UPSERT_DIALECTS.get(
+            self.session.sync_session.get_bind().dialect.name
+        )
+        if dialect is not None:
+            async with unit_of_work(self.session):
+                result = await self.session.execute(
+                    dialect.insert(User.__table__).on_conflict_do_nothing(
+                        index_elements=[User.__table__.c.email],
+                    ),
+                    values,
+                )
+            return result.rowcount if result.rowcount >= 0 else len(values)
+        statement = insert(User.__table__)
+        try:
+            async with unit_of_work(self.session):
+                await self.session.execute(statement, values)
+            return len(values)
+        except IntegrityError:
+            pass
+        # Email заняли между проверкой и вставкой: пачка повторяется по
+        # одной строке, и пропускаются только конфликтующие.
+        created = 0
+        for value in values:
+            try:
+                async with unit_of_work(self.session):
+                    await self.session.execute(statement, value)
+            except IntegrityError:
+                continue
+            created += 1
+        return created
+
+
+async def import_users(
+    session: AsyncSession,
+    records: Iterable[Union[dict[str, Any], ValueError]],
+    batch_size: int = USER_IMPORT_BATCH_SIZE,
+) -> UserImportReport:
+    """Импорт с хэшированием в общем пуле потоков ``password_pool``."""
+    return await UserImport(
+        session, password_pool.hash_many, batch_size,
+    ).run(records)
+
+
+async def import_users_in_processes(
+    session: AsyncSession,
+    records: Iterable[Union[dict[str, Any], ValueError]],
+    workers: Optional[int] = None,
+    batch_size: int = USER_IMPORT_BATCH_SIZE,
+) -> UserImportReport:
+    """Импорт с собственным пулом процессов; только для скрипта импорта."""
+    workers = workers or settings.user_import_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        return await UserImport(
+            session, partial(hash_in_processes, executor, workers),
+            batch_size,
+        ).run(records)
@@ -0,0 +1,102 @@
+"""Пропускная способность создания пожертвований при 1, 8 и 64 донорах.
+
+Сравнивает последовательный движок распределения с прежним режимом,
+в котором каждый запрос распределяет средства сам и при блокировке
+SQLite повторяет транзакцию.
+
+Запуск: python -m benchmarks.allocation_concurrency
+"""
+import asyncio
+import tempfile
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import Base
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate
+
+CONCURRENCY = (1, 8, 64)
+DONATIONS_TOTAL = 512
+PROJECTS = 200
+MAX_RETRIES = 20
+
+
+async def donor(session_factory, user, donations, stats):
+    for _ in range(donations):
+        for attempt in range(MAX_RETRIES):
+            async with session_factory() as session:
+                try:
+                    await donation_crud.create_and_process_donation(
+                        DonationCreate(full_amount=7), session, user,
+                    )
+                    break
+                except OperationalError:
+                    stats['retries'] += 1
+            await asyncio.sleep(0.001 * 2 ** min(attempt, 6))
+        else:
+            stats['failed'] += 1
+
+
+async def measure(concurrency, serialized):
+    settings.allocation_serialized = serialized
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_dir}/b.db')
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with session_factory() as session:
+            session.add_all(
+                CharityProject(
+                    name=f'project {number}',
+                    description='benchmark',
+                    full_amount=100,
+                )
+                for number in range(PROJECTS)
+            )
+            await session.commit()
+
+        stats = {'retries': 0, 'failed': 0}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            donor(
+                session_factory,
+                User(id=number + 1),
+                DONATIONS_TOTAL // concurrency,
+                stats,
+            )
+            for number in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+        async with session_factory() as session:
+            to_projects = (await session.execute(
+                select(func.sum(CharityProject.invested_amount))
+            )).scalar()
+            from_donations = (await session.execute(
+                select(func.sum(Donation.invested_amount))
+            )).scalar()
+        await engine.dispose()
+
+    mode = 'serialized' if serialized else 'retry'
+    print(
+        f'{mode:>10} donors={concurrency:<3} '
+        f'{DONATIONS_TOTAL / elapsed:8.1f} donations/s '
+        f'retries={stats["retries"]} failed={stats["failed"]} '
+        f'consistent={to_projects == from_donations}'
+    )
+
+
+async def main():
+    for concurrency in CONCURRENCY:
+        for serialized in (False, True):
+            await measure(concurrency, serialized)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""Время и пиковая память выгрузки 5M пожертвований в CSV и Parquet.
+
+Заполняет временную базу SQLite и прогоняет ту же цепочку, что и
+GET /donation/export: серверный курсор, порции и потоковый кодировщик.
+Байты выгрузки только подсчитываются.
+
+Запуск: python -m benchmarks.export
+"""
+import asyncio
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import Base
+from app.crud.donation import DONATION_COLUMNS, donation_crud
+from app.models import Donation
+from app.services.export import ExportFormat, export_rows, pa
+
+ROWS = 5_000_000
+
+
+def fill(path):
+    start = datetime(2020, 1, 1)
+    date_format = '%Y-%m-%d %H:%M:%S.%f'
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            'INSERT INTO donation (id, full_amount, invested_amount, '
+            'fully_invested, create_date, user_id, comment) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                (
+                    number, 100, 100, True,
+                    (start + timedelta(seconds=number)).strftime(date_format),
+                    number % 1000 + 1, 'benchmark',
+                )
+                for number in range(1, ROWS + 1)
+            ),
+        )
+
+
+async def measure(session_factory, export_format):
+    async with session_factory() as session:
+        response = export_rows(
+            Donation,
+            DONATION_COLUMNS,
+            donation_crud.stream_chunks(
+                session,
+                DONATION_COLUMNS,
+                chunk_size=export_format.chunk_size,
+            ),
+            export_format,
+        )
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = 0
+        async for part in response.body_iterator:
+            size += len(part)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    print(
+        f'{export_format.value:>8} {elapsed:7.1f} s '
+        f'{ROWS / elapsed:10.0f} rows/s {size / 2 ** 20:8.1f} MiB '
+        f'peak={peak / 2 ** 20:.1f} MiB'
+    )
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_dir}/b.db')
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        fill(f'{tmp_dir}/b.db')
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        await measure(session_factory, ExportFormat.csv)
+        if pa is not None:
+            await measure(session_factory, ExportFormat.parquet)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""Планы и время запроса открытого пула и GET /donation/my на 1M строк.
+
+Заполняет временную базу SQLite миллионом проектов и миллионом
+пожертвований (открыт лишь небольшой хвост), затем для каждого запроса
+печатает EXPLAIN QUERY PLAN и среднее время до и после создания
+индексов из моделей.
+
+Запуск: python -m benchmarks.indexes
+"""
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+
+from app.core.db import Base
+from app.crud.base import OPEN_POOL_COLUMNS, CRUDBase
+from app.models import CharityProject, Donation
+
+ROWS = 1_000_000
+OPEN_SHARE = 0.01
+USERS = 10_000
+REPEAT = 20
+NEW_INDEXES = (
+    'ix_charityproject_open_fifo',
+    'ix_donation_open_fifo',
+    'ix_donation_user_id',
+    'ix_charityproject_create_date',
+    'ix_charityproject_close_date',
+    'ix_donation_create_date',
+    'ix_donation_close_date',
+)
+
+
+def fill(conn):
+    start = datetime(2020, 1, 1)
+    closed_rows = int(ROWS * (1 - OPEN_SHARE))
+
+    def rows(extra):
+        for number in range(1, ROWS + 1):
+            closed = number <= closed_rows
+            yield (
+                number, 100, 100 if closed else 0, closed,
+                f'{start + timedelta(seconds=number):%Y-%m-%d %H:%M:%S.%f}',
+                *extra(number),
+            )
+
+    conn.exec_driver_sql(
+        'INSERT INTO charityproject (id, full_amount, invested_amount, '
+        'fully_invested, create_date, name, description) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        list(rows(lambda number: (f'project {number}', 'benchmark'))),
+    )
+    conn.exec_driver_sql(
+        'INSERT INTO donation (id, full_amount, invested_amount, '
+        'fully_invested, create_date, user_id) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        list(rows(lambda number: (number % USERS + 1,))),
+    )
+
+
+def queries():
+    last_key = datetime(2020, 1, 1) + timedelta(seconds=ROWS - 100), 0
+    for model in (CharityProject, Donation):
+        open_filter = model.fully_invested == False  # noqa
+        yield f'{model.__tablename__} open pool', CRUDBase(model).fifo_query(
+            OPEN_POOL_COLUMNS, open_filter,
+        )
+        yield f'{model.__tablename__} open pool, next chunk', CRUDBase(
+            model
+        ).fifo_query(OPEN_POOL_COLUMNS, open_filter, after=last_key)
+    yield 'donation get_by_user', select(Donation).where(
+        Donation.user_id == 42,
+    )
+
+
+def report(conn, title):
+    print(f'--- {title}')
+    for name, query in queries():
+        compiled = query.compile(dialect=conn.dialect)
+        params = compiled.construct_params()
+        plan = conn.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {compiled}',
+            tuple(params[key] for key in compiled.positiontup),
+        ).all()
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            conn.execute(query).all()
+        elapsed = (time.perf_counter() - started) / REPEAT
+        print(f'{name:<36} {elapsed * 1000:9.2f} ms')
+        for row in plan:
+            print(f'    {row[-1]}')
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(f'sqlite:///{tmp_dir}/b.db')
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            for name in NEW_INDEXES:
+                conn.exec_driver_sql(f'DROP INDEX {name}')
+            fill(conn)
+        with engine.begin() as conn:
+            report(conn, 'без индексов')
+            for table in (CharityProject.__table__, Donation.__table__):
+                for index in table.indexes:
+                    if index.name in NEW_INDEXES:
+                        index.create(conn)
+            report(conn, 'с индексами')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
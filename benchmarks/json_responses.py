@@ -0,0 +1,81 @@
+"""Сериализация списка проектов на 10k и 100k строк.
+
+Сравнивает прежний путь FastAPI (валидация каждой строки моделью
+ответа, ``jsonable_encoder``, стандартный json) с ``rows_response``:
+словари из строк и кодирование через orjson, если он установлен.
+
+Запуск: python -m benchmarks.json_responses
+"""
+import asyncio
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import Response
+
+from app.api.utils import rows_response
+from app.core.encoders import orjson
+from app.schemas.charity_project import CharityProjectDB
+from app.services.charity_project import PROJECT_COLUMNS
+
+SIZES = (10_000, 100_000)
+ProjectRow = namedtuple('ProjectRow', PROJECT_COLUMNS)
+
+
+def make_rows(size):
+    start = datetime(2020, 1, 1)
+    return [
+        ProjectRow(
+            name=f'project {number}',
+            description='Котики ' * 20,
+            full_amount=1000,
+            id=number,
+            invested_amount=number % 1000,
+            create_date=start + timedelta(seconds=number, microseconds=7),
+            close_date=None,
+            fully_invested=False,
+        )
+        for number in range(1, size + 1)
+    ]
+
+
+async def validated(rows):
+    field = create_response_field(
+        name='response', type_=list[CharityProjectDB],
+    )
+    content = await serialize_response(
+        field=field, response_content=rows, exclude_none=True,
+    )
+    return JSONResponse(content).body
+
+
+async def trusted(rows):
+    return rows_response(
+        rows, PROJECT_COLUMNS, Response(), exclude_none=True,
+    ).body
+
+
+async def main():
+    print(f'orjson: {"да" if orjson is not None else "нет"}')
+    for size in SIZES:
+        rows = make_rows(size)
+        results = {}
+        for name, encode in (('validated', validated), ('trusted', trusted)):
+            started = time.perf_counter()
+            results[name] = await encode(rows)
+            elapsed = time.perf_counter() - started
+            print(
+                f'{name:>10} rows={size:<7} {elapsed * 1000:9.1f} ms '
+                f'{size / elapsed:10.0f} rows/s'
+            )
+        print(
+            f'{"":>10} same body: '
+            f'{results["validated"] == results["trusted"]}'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Нагрузка на POST /donation/ от нескольких воркеров uvicorn.
+
+Поднимает uvicorn с несколькими воркерами над временной базой SQLite и
+общей файловой блокировкой распределения, отправляет пожертвования
+параллельно и проверяет, что суммы в проектах и пожертвованиях сошлись.
+
+Запуск: python -m benchmarks.multiworker
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+WORKERS = 4
+DONORS = 32
+DONATIONS_PER_DONOR = 20
+PROJECTS = 50
+PORT = 8765
+BASE_URL = f'http://127.0.0.1:{PORT}'
+SUPERUSER = {'username': 'root@admin.ru', 'password': 'root'}
+
+
+def wait_for_server():
+    for _ in range(100):
+        try:
+            requests.get(f'{BASE_URL}/charity_project/')
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise RuntimeError('Сервер не запустился.')
+
+
+def get_token():
+    response = requests.post(f'{BASE_URL}/auth/jwt/login', data=SUPERUSER)
+    response.raise_for_status()
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+def donate(headers):
+    failed = 0
+    for _ in range(DONATIONS_PER_DONOR):
+        response = requests.post(
+            f'{BASE_URL}/donation/', json={'full_amount': 7},
+            headers=headers,
+        )
+        failed += not response.ok
+    return failed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'qr_kot.db')
+        env = dict(
+            os.environ,
+            DATABASE_URL=f'sqlite+aiosqlite:///{db_path}',
+            ALLOCATION_LOCK_PATH=os.path.join(tmp_dir, 'allocation.lock'),
+        )
+        subprocess.run(['alembic', 'upgrade', 'head'], env=env, check=True)
+        subprocess.run(
+            [sys.executable, 'setup_for_postman.py'], env=env, check=True,
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'uvicorn', 'app.main:app',
+                '--workers', str(WORKERS), '--port', str(PORT),
+            ],
+            env=env,
+        )
+        try:
+            wait_for_server()
+            headers = get_token()
+            for number in range(PROJECTS):
+                requests.post(
+                    f'{BASE_URL}/charity_project/',
+                    json={
+                        'name': f'project {number}',
+                        'description': 'multiworker',
+                        'full_amount': 100,
+                    },
+                    headers=headers,
+                ).raise_for_status()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(DONORS) as pool:
+                failed = sum(pool.map(donate, [headers] * DONORS))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+        with sqlite3.connect(db_path) as connection:
+            to_projects, = connection.execute(
+                'SELECT SUM(invested_amount) FROM charityproject'
+            ).fetchone()
+            from_donations, = connection.execute(
+                'SELECT SUM(invested_amount) FROM donation'
+            ).fetchone()
+    total = DONORS * DONATIONS_PER_DONOR
+    print(
+        f'workers={WORKERS} donors={DONORS} '
+        f'{total / elapsed:.1f} donations/s failed={failed} '
+        f'consistent={to_projects == from_donations}'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Задержки входа и создания пожертвований при одновременных входах.
+
+Запускает поток входов (проверка пароля bcrypt) вместе с потоком
+пожертвований и печатает p50/p99 каждого: с хэшированием в цикле
+событий (concurrency=0) и в пуле ``password_pool``.
+
+Запуск: python -m benchmarks.passwords
+"""
+import asyncio
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import Base
+from app.core.password import password_pool
+from app.core.user import CachedUserDatabase, UserManager
+from app.crud.donation import donation_crud
+from app.models import CharityProject, User
+from app.schemas.donation import DonationCreate
+from app.schemas.user import UserCreate
+
+LOGINS = 64
+DONATIONS = 64
+DONATION_INTERVAL = 0.01
+EMAIL = 'dead@pool.com'
+PASSWORD = 'chimichangas4life'
+
+
+def percentiles(latencies):
+    cuts = statistics.quantiles(latencies, n=100)
+    return f'p50={cuts[49] * 1000:7.1f} ms p99={cuts[98] * 1000:7.1f} ms'
+
+
+async def login(session_factory, latencies):
+    started = time.perf_counter()
+    async with session_factory() as session:
+        manager = UserManager(
+            CachedUserDatabase(session, User), password_pool.helper,
+        )
+        user = await manager.authenticate(
+            SimpleNamespace(username=EMAIL, password=PASSWORD)
+        )
+    assert user is not None
+    latencies.append(time.perf_counter() - started)
+
+
+async def donate(session_factory, user, latencies):
+    started = time.perf_counter()
+    async with session_factory() as session:
+        await donation_crud.create_and_process_donation(
+            DonationCreate(full_amount=7), session, user,
+        )
+    latencies.append(time.perf_counter() - started)
+
+
+async def donations(session_factory, user, latencies):
+    tasks = []
+    for _ in range(DONATIONS):
+        tasks.append(asyncio.create_task(
+            donate(session_factory, user, latencies)
+        ))
+        await asyncio.sleep(DONATION_INTERVAL)
+    await asyncio.gather(*tasks)
+
+
+async def measure(concurrency):
+    password_pool.shutdown()
+    password_pool.concurrency = concurrency
+    password_pool.queue_size = LOGINS
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_dir}/b.db')
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession)
+        async with session_factory() as session:
+            user = await UserManager(
+                CachedUserDatabase(session, User), password_pool.helper,
+            ).create(UserCreate(email=EMAIL, password=PASSWORD))
+            user = User(id=user.id)
+            session.add(CharityProject(
+                name='project', description='benchmark', full_amount=10 ** 6,
+            ))
+            await session.commit()
+
+        login_latencies, donation_latencies = [], []
+        started = time.perf_counter()
+        await asyncio.gather(
+            donations(session_factory, user, donation_latencies),
+            *(
+                login(session_factory, login_latencies)
+                for _ in range(LOGINS)
+            ),
+        )
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+    mode = 'inline' if concurrency == 0 else f'pool={concurrency}'
+    print(f'{mode:>8} total={elapsed:5.1f} s')
+    print(f'{"login":>14} {percentiles(login_latencies)}')
+    print(f'{"donation":>14} {percentiles(donation_latencies)}')
+
+
+async def main():
+    for concurrency in (0, 1, 4):
+        await measure(concurrency)
+    password_pool.shutdown()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
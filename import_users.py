@@ -0,0 +1,49 @@
+"""Массовый импорт пользователей из CSV или NDJSON.
+
+Файл содержит поля email и password, а также необязательные
+is_active, is_superuser и is_verified. Существующие email пропускаются.
+
+Запуск: python import_users.py users.csv [--format ndjson] [--workers 4]
+"""
+import argparse
+import asyncio
+
+from app.constants import USER_IMPORT_BATCH_SIZE
+from app.core.init_db import get_async_session_context
+from app.services.user_import import (
+    ImportFormat, import_users_in_processes, read_records,
+)
+
+
+async def main(path: str, import_format: ImportFormat, workers, batch_size):
+    with open(path, encoding='utf-8-sig', newline='') as lines:
+        async with get_async_session_context() as session:
+            report = await import_users_in_processes(
+                session, read_records(lines, import_format),
+                workers, batch_size,
+            )
+    for error in report.errors:
+        print(f'Строка {error.row} ({error.email}): {error.detail}')
+    print(
+        f'Строк: {report.rows}, создано: {report.created}, '
+        f'пропущено: {report.skipped}, ошибок: {report.failed}, '
+        f'{report.rows_per_second:.0f} строк/с'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='путь к файлу')
+    parser.add_argument(
+        '--format', type=ImportFormat, default=ImportFormat.csv,
+        choices=list(ImportFormat),
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='процессов для хэширования паролей',
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=USER_IMPORT_BATCH_SIZE,
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.format, args.workers, args.batch_size))
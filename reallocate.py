@@ -0,0 +1,48 @@
+"""Пересчёт распределения средств по всей базе.
+
+Заново вычисляет `invested_amount`, `fully_invested`, `close_date` и журнал
+вложений, проигрывая проекты и пожертвования в порядке создания.
+
+Запуск: python reallocate.py [--dry-run] [--chunk-size 500]
+"""
+import argparse
+import asyncio
+
+from app.constants import ALLOCATION_CHUNK_SIZE
+from app.core.db import unit_of_work
+from app.core.init_db import get_async_session_context
+from app.services.allocator import allocation_engine
+from app.services.reallocation import Replay
+
+
+async def reallocate(dry_run: bool, chunk_size: int, max_diffs: int):
+    async with get_async_session_context() as session:
+        async with allocation_engine.turn(), unit_of_work(session):
+            report = await Replay(
+                session, dry_run, chunk_size, max_diffs,
+            ).run()
+    for diff in report.diffs:
+        print(diff)
+    print(
+        f'Строк: {report.rows}, изменится: {report.changed}, '
+        f'вложений: {report.transfers}, '
+        f'{report.rows_per_second:.0f} строк/с'
+        f'{" (dry run)" if dry_run else ""}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='только показать расхождения, ничего не записывая',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=ALLOCATION_CHUNK_SIZE,
+    )
+    parser.add_argument(
+        '--max-diffs', type=int, default=20,
+        help='сколько расхождений вывести',
+    )
+    args = parser.parse_args()
+    asyncio.run(reallocate(args.dry_run, args.chunk_size, args.max_diffs))
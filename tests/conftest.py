@@ -1,3 +1,5 @@
+import os
+import sqlite3
 from pathlib import Path
 
 import pytest
@@ -7,6 +9,11 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+os.environ.setdefault('QUERY_STATS_HEADERS', 'true')
+os.environ.setdefault('SINGLE_PROCESS', 'true')
+# Смена интервала ETag между двумя запросами теста сделала бы его нестабильным.
+os.environ.setdefault('ETAG_TTL', '0')
+
 try:
     from app.main import app  # noqa
 except (NameError, ImportError) as error:
@@ -42,6 +49,8 @@ except (NameError, ImportError) as error:
         f'{type(error).__name__}: {error}.'
     )
 
+from app.core.cache import cache  # noqa
+from app.core.user import user_cache  # noqa
 
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -61,6 +70,18 @@ TestingSessionLocal = sessionmaker(
 )
 
 
+def allocation_state():
+    """Вложено и закрыто по проектам и пожертвованиям в порядке id."""
+    with sqlite3.connect(TEST_DB) as conn:
+        return [
+            conn.execute(
+                f'SELECT invested_amount, fully_invested FROM {table} '
+                'ORDER BY id'
+            ).fetchall()
+            for table in ('charityproject', 'donation')
+        ]
+
+
 async def override_db():
     async with TestingSessionLocal() as session:
         yield session
@@ -73,6 +94,8 @@ async def init_db():
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    cache.clear()
+    user_cache.clear()
 
 
 @pytest.fixture
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from app.services.allocation import (
+    AllocationPlan, amounts_array, plan_allocation,
+)
+
+
+def sequential_allocation(need, remaining):
+    """Пошаговое распределение, как в прежней `money_distribution`."""
+    remaining = list(remaining)
+    absorbed = 0
+    for index, source_rem in enumerate(remaining):
+        rem_in = need - absorbed
+        if rem_in > source_rem:
+            absorbed += source_rem
+            remaining[index] = 0
+        elif rem_in == source_rem:
+            remaining[index] = 0
+            return remaining, need, True
+        else:
+            remaining[index] -= rem_in
+            return remaining, need, True
+    return remaining, absorbed, False
+
+
+def apply(plan, remaining):
+    remaining = list(remaining)
+    for index, amount in plan.iter_transfers(remaining):
+        remaining[index] -= amount
+    return remaining, plan.absorbed, plan.incoming_closed
+
+
+@pytest.mark.parametrize('need, remaining, expected', [
+    (100, [], AllocationPlan(0, 0, 0, False)),
+    (100, [30, 30], AllocationPlan(2, 0, 60, False)),
+    (60, [30, 30, 30], AllocationPlan(2, 0, 60, True)),
+    (50, [30, 30, 30], AllocationPlan(1, 20, 50, True)),
+    (10, [30], AllocationPlan(0, 10, 10, True)),
+    (0, [30], AllocationPlan(0, 0, 0, True)),
+])
+def test_plan_allocation(need, remaining, expected):
+    assert plan_allocation(need, amounts_array(remaining)) == expected, (
+        'План распределения отличается от ожидаемого.'
+    )
+
+
+def test_plan_allocation_matches_sequential():
+    rnd = random.Random(42)
+    for _ in range(2000):
+        remaining = [rnd.randint(0, 50) for _ in range(rnd.randint(0, 20))]
+        need = rnd.randint(0, 300)
+        plan = plan_allocation(need, amounts_array(remaining))
+        assert apply(plan, remaining) == sequential_allocation(
+            need, remaining
+        ), (
+            'Результат `plan_allocation` должен совпадать с пошаговым '
+            f'распределением: need={need}, remaining={remaining}.'
+        )
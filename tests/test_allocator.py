@@ -0,0 +1,203 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.donation import donation_crud
+from app.models import CharityProject, User
+from app.schemas.donation import DonationCreate
+from app.services.allocator import (
+    InterProcessLock, MicroBatcher, allocation_engine,
+)
+
+WORKERS = 4
+INCREMENTS = 25
+
+
+def locked_increments(lock_path, counter_path, times):
+    async def run():
+        lock = InterProcessLock(lock_path)
+        for _ in range(times):
+            async with lock.hold():
+                with open(counter_path) as counter:
+                    value = int(counter.read())
+                time.sleep(0.001)
+                with open(counter_path, 'w') as counter:
+                    counter.write(str(value + 1))
+
+    asyncio.run(run())
+
+
+def die_holding_lock(lock_path):
+    InterProcessLock(lock_path).try_acquire()
+    os._exit(0)
+
+
+@pytest.mark.asyncio
+async def test_allocation_engine_serializes_jobs():
+    state = {'invested': 0, 'order': []}
+
+    async def job(number):
+        invested = state['invested']
+        await asyncio.sleep(0)
+        state['invested'] = invested + 1
+        state['order'].append(number)
+        return number
+
+    results = await asyncio.gather(*(
+        allocation_engine.run(lambda number=number: job(number))
+        for number in range(64)
+    ))
+    assert state['invested'] == 64, (
+        'Одновременные изменения открытого пула не должны терять '
+        'обновления: движок распределения выполняет их по очереди.'
+    )
+    assert state['order'] == list(range(64)) == results, (
+        'Движок распределения должен выполнять задачи в порядке поступления.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_allocation_engine_propagates_errors():
+    async def failing():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        await allocation_engine.run(failing)
+
+    async def succeeding():
+        return 'ok'
+
+    assert await allocation_engine.run(succeeding) == 'ok', (
+        'После ошибки в задаче движок должен продолжать работу.'
+    )
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='Нужен fork.')
+def test_inter_process_lock(tmp_path):
+    lock_path = str(tmp_path / 'allocation.lock')
+    counter_path = tmp_path / 'counter'
+    counter_path.write_text('0')
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(
+            target=locked_increments,
+            args=(lock_path, str(counter_path), INCREMENTS),
+        )
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert int(counter_path.read_text()) == WORKERS * INCREMENTS, (
+        'Файловая блокировка должна допускать только один процесс '
+        'распределения одновременно.'
+    )
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='Нужен fork.')
+def test_inter_process_lock_failover(tmp_path):
+    lock_path = str(tmp_path / 'allocation.lock')
+    holder = multiprocessing.get_context('fork').Process(
+        target=die_holding_lock, args=(lock_path,),
+    )
+    holder.start()
+    holder.join()
+    lock = InterProcessLock(lock_path)
+    assert lock.try_acquire(), (
+        'После падения процесса-владельца блокировка должна освобождаться.'
+    )
+    lock.release()
+
+
+@pytest.mark.asyncio
+async def test_donation_group_commit(monkeypatch):
+    monkeypatch.setattr(settings, 'donation_batch_window_ms', 50)
+    metrics.reset()
+    async with TestingSessionLocal() as session:
+        session.add(CharityProject(
+            name='nunchaku', description='Nunchaku is better',
+            full_amount=250,
+        ))
+        await session.commit()
+
+    sessions = [TestingSessionLocal() for _ in range(3)]
+    try:
+        donations = await asyncio.gather(*(
+            donation_crud.create_and_process_donation(
+                DonationCreate(full_amount=100), session, User(id=2),
+            )
+            for session in sessions
+        ))
+    finally:
+        for session in sessions:
+            await session.close()
+
+    assert len({donation.id for donation in donations}) == 3, (
+        'Каждый участник пачки должен получить своё пожертвование.'
+    )
+    assert [donation.invested_amount for donation in donations] == [
+        100, 100, 50,
+    ], 'Пачка должна распределяться так же, как последовательные запросы.'
+    summary = metrics.snapshot()['summaries']['donation_batch.size']
+    assert summary['count'] == 1 and summary['max'] == 3, (
+        'Пожертвования, пришедшие в одно окно, должны попасть в одну пачку.'
+    )
+    async with TestingSessionLocal() as session:
+        project = (await session.execute(select(CharityProject))).scalar()
+    assert project.fully_invested and project.invested_amount == 250
+
+
+@pytest.mark.asyncio
+async def test_micro_batch_isolates_failures():
+    sessions = []
+
+    async def process(items, session):
+        sessions.append(session)
+        if 'bad' in items:
+            raise ValueError('bad item')
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher('test_batch', process)
+    async with TestingSessionLocal() as session:
+        results = await asyncio.gather(*(
+            batcher.submit(item, session, 20, 10)
+            for item in ('ok', 'bad', 'fine')
+        ), return_exceptions=True)
+
+    assert results[0] == 'OK' and results[2] == 'FINE', (
+        'Ошибка одного элемента не должна ронять остальных участников пачки.'
+    )
+    assert isinstance(results[1], ValueError)
+    assert session not in sessions, (
+        'Пачка должна выполняться в собственной сессии, '
+        'а не в сессии первого вызывающего.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_micro_batch_keeps_running_task():
+    release = asyncio.Event()
+
+    async def process(items, session):
+        await release.wait()
+        return items
+
+    batcher = MicroBatcher('test_batch', process)
+    async with TestingSessionLocal() as session:
+        submitted = asyncio.ensure_future(batcher.submit('a', session, 0, 1))
+        await asyncio.sleep(0.01)
+        assert len(batcher._tasks) == 1, (
+            'Пачка должна держать ссылку на свою задачу, иначе сборщик '
+            'мусора может уничтожить её до завершения.'
+        )
+        release.set()
+        assert await submitted == 'a'
+    assert not batcher._tasks
@@ -1,4 +1,33 @@
+from conftest import (
+    app, current_user, engine, get_async_session, override_db
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.user import TokenRevocations, claims_trusted, stateless_user
+
 REGISTER_URL = '/auth/register'
+LOGIN_URL = '/auth/jwt/login'
+MY_DONATIONS_URL = '/donation/my'
+
+
+class FakeClock:
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def auth_counters():
+    return {
+        name: value
+        for name, value in metrics.snapshot()['counters'].items()
+        if name.startswith('auth.')
+    }
 
 
 def test_register(test_client):
@@ -49,3 +78,149 @@ def test_register_invalid_pass(user_client):
         'Убедитесь, что в ответе на некорректный POST-запрос '
         f'к эндпоинту `{REGISTER_URL}` есть ключ `detail`.'
     )
+
+
+def test_token_revocations():
+    clock = FakeClock(100.0)
+    revocations = TokenRevocations(clock=clock)
+    assert not revocations.is_fresh(1, 99.0), (
+        'Токены, выпущенные до запуска процесса, не должны считаться '
+        'свежими.'
+    )
+    assert revocations.is_fresh(1, 101.0)
+    clock.now = 102.0
+    revocations.revoke(1)
+    assert not revocations.is_fresh(1, 101.0)
+    assert revocations.is_fresh(2, 101.0)
+    assert revocations.is_fresh(1, 103.0)
+
+
+def test_claims_trusted_single_process_only(monkeypatch):
+    monkeypatch.setattr(settings, 'stateless_jwt', True)
+    monkeypatch.setattr(settings, 'single_process', False)
+    assert not claims_trusted(), (
+        'Отзывы токенов ведутся в памяти процесса, поэтому claims можно '
+        'доверять только при `SINGLE_PROCESS`.'
+    )
+    monkeypatch.setattr(settings, 'single_process', True)
+    assert claims_trusted()
+
+
+def test_stateless_jwt_trusts_fresh_claims(monkeypatch):
+    monkeypatch.setattr(settings, 'stateless_jwt', True)
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[current_user] = stateless_user()
+    credentials = {'email': 'dead@pool.com', 'password': 'chimichangas4life'}
+    with TestClient(app) as client:
+        client.post(REGISTER_URL, json=credentials)
+
+        def login():
+            response = client.post(LOGIN_URL, data={
+                'username': credentials['email'],
+                'password': credentials['password'],
+            })
+            token = response.json()['access_token']
+            return {'Authorization': f'Bearer {token}'}
+
+        headers = login()
+        metrics.reset()
+        assert client.get(MY_DONATIONS_URL, headers=headers).json() == []
+        assert auth_counters() == {'auth.claims': 1}, (
+            'Свежий токен не должен требовать чтения пользователя из базы.'
+        )
+        credentials['password'] = 'nunchaku4life'
+        response = client.patch(
+            '/users/me', json={'password': credentials['password']},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        metrics.reset()
+        assert client.get(MY_DONATIONS_URL, headers=headers).json() == []
+        assert auth_counters() == {'auth.lookup': 1}, (
+            'После изменения пользователя claims выпущенных ранее токенов '
+            'должны проверяться по базе.'
+        )
+        metrics.reset()
+        client.get(MY_DONATIONS_URL, headers=login())
+        assert auth_counters() == {'auth.claims': 1}
+        assert client.get(MY_DONATIONS_URL).status_code == 401
+    app.dependency_overrides = {}
+
+
+def test_user_cache_single_process_only(monkeypatch):
+    monkeypatch.setattr(settings, 'single_process', False)
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    credentials = {'email': 'dead@pool.com', 'password': 'chimichangas4life'}
+    with TestClient(app) as client:
+        client.post(REGISTER_URL, json=credentials)
+        token = client.post(LOGIN_URL, data={
+            'username': credentials['email'],
+            'password': credentials['password'],
+        }).json()['access_token']
+        metrics.reset()
+        for _ in range(2):
+            client.get(
+                MY_DONATIONS_URL,
+                headers={'Authorization': f'Bearer {token}'},
+            )
+    assert not any(
+        name.startswith('cache.user.') for name in metrics.snapshot()[
+            'counters'
+        ]
+    ), (
+        'Без `SINGLE_PROCESS` права пользователя не должны браться из кэша: '
+        'другие воркеры не узнают об их изменении.'
+    )
+    app.dependency_overrides = {}
+
+
+def test_user_cache_reduces_user_queries():
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    user_selects = []
+
+    def count_user_selects(conn, cursor, statement, *args):
+        if statement.startswith('SELECT') and 'FROM user' in statement:
+            user_selects.append(statement)
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', count_user_selects,
+    )
+    credentials = {'email': 'dead@pool.com', 'password': 'chimichangas4life'}
+    try:
+        with TestClient(app) as client:
+            client.post(REGISTER_URL, json=credentials)
+            token = client.post(LOGIN_URL, data={
+                'username': credentials['email'],
+                'password': credentials['password'],
+            }).json()['access_token']
+            headers = {'Authorization': f'Bearer {token}'}
+            user_selects.clear()
+            for _ in range(10):
+                response = client.get(MY_DONATIONS_URL, headers=headers)
+                assert response.status_code == 200
+            assert len(user_selects) == 1, (
+                'Повторные запросы с тем же токеном должны читать '
+                'пользователя из кэша.'
+            )
+            response = client.patch(
+                '/users/me', json={'password': 'nunchaku4life'},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            user_selects.clear()
+            client.get(MY_DONATIONS_URL, headers=headers)
+            assert len(user_selects) == 1, (
+                'Изменение пользователя должно сбрасывать запись кэша.'
+            )
+            assert client.post(LOGIN_URL, data={
+                'username': credentials['email'],
+                'password': 'nunchaku4life',
+            }).status_code == 200
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', count_user_selects,
+        )
+        app.dependency_overrides = {}
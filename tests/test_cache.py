@@ -0,0 +1,215 @@
+import asyncio
+
+import pytest
+
+from app.api.utils import Page, list_etag
+from app.core.cache import CacheBackend, MemoryCache, SingleFlight
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.donation import user_version_key
+
+PROJECTS_URL = '/charity_project/'
+DONATIONS_URL = '/donation/'
+MY_DONATIONS_URL = DONATIONS_URL + 'my'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_cache_lru_and_ttl():
+    clock = FakeClock()
+    cache = MemoryCache(max_size=2, ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None, (
+        'При переполнении кэш должен вытеснять давно не читавшиеся записи.'
+    )
+    assert cache.get('a') == 1
+    clock.now = 10
+    assert cache.get('a') is None, (
+        'Запись кэша не должна читаться после истечения TTL.'
+    )
+
+
+def test_memory_cache_versions_survive_clear():
+    cache = MemoryCache(max_size=1, ttl=10)
+    cache.bump('charityproject')
+    cache.set('x', 1)
+    cache.set('y', 2)
+    cache.clear()
+    assert cache.version('charityproject') == 1
+    assert cache.version('donation') == 0
+
+
+def test_project_list_cache_invalidated_on_create(superuser_client):
+    assert superuser_client.get(PROJECTS_URL).json() == []
+    assert superuser_client.get(PROJECTS_URL).json() == []
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1000,
+    })
+    assert [
+        project['name'] for project in superuser_client.get(
+            PROJECTS_URL
+        ).json()
+    ] == ['Мертвый Бассейн'], (
+        'Создание проекта должно сбрасывать кэш списка проектов.'
+    )
+
+
+def test_cache_backend_requires_interface():
+    class PartialCache(CacheBackend):
+
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialCache(max_size=1, ttl=1)
+
+
+def test_project_list_cache_single_process_only(superuser_client,
+                                                monkeypatch):
+    monkeypatch.setattr(settings, 'single_process', False)
+    metrics.reset()
+    superuser_client.get(PROJECTS_URL)
+    superuser_client.get(PROJECTS_URL)
+    counters = metrics.snapshot()['counters']
+    assert not any(name.startswith('cache.') for name in counters), (
+        'Без `SINGLE_PROCESS` ответы не должны кэшироваться в памяти '
+        'процесса: другие воркеры не сбросят такой кэш.'
+    )
+
+
+def test_project_list_not_modified(superuser_client):
+    etag = superuser_client.get(PROJECTS_URL).headers['ETag']
+    assert etag.startswith('W/')
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag},
+    )
+    assert response.status_code == 304, (
+        'Если данные не менялись, GET-запрос с актуальным `If-None-Match` '
+        'должен вернуть ответ со статус-кодом 304.'
+    )
+    superuser_client.post(PROJECTS_URL, json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1000,
+    })
+    response = superuser_client.get(
+        PROJECTS_URL, headers={'If-None-Match': etag},
+    )
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_my_donations_not_modified(user_client):
+    etag = user_client.get(MY_DONATIONS_URL).headers['ETag']
+    response = user_client.get(
+        MY_DONATIONS_URL, headers={'If-None-Match': etag},
+    )
+    assert response.status_code == 304
+    user_client.post(DONATIONS_URL, json={'full_amount': 10})
+    response = user_client.get(
+        MY_DONATIONS_URL, headers={'If-None-Match': etag},
+    )
+    assert response.status_code == 200, (
+        'Новое пожертвование пользователя должно менять ETag '
+        f'`{MY_DONATIONS_URL}`.'
+    )
+    assert len(response.json()) == 1
+
+
+def test_my_donations_etag_per_user():
+    page = Page(limit=None, cursor=None)
+    assert list_etag(user_version_key(1), page, None) != list_etag(
+        user_version_key(2), page, None,
+    ), (
+        'У разных пользователей с равными версиями пожертвований ETag '
+        f'`{MY_DONATIONS_URL}` не должны совпадать.'
+    )
+
+
+def test_list_etag_expires(monkeypatch):
+    monkeypatch.setattr(settings, 'etag_ttl', 30)
+    clock = FakeClock()
+    page = Page(limit=None, cursor=None)
+    etag = list_etag('charityproject', page, None, clock)
+    clock.now = 29
+    assert list_etag('charityproject', page, None, clock) == etag
+    clock.now = 30
+    assert list_etag('charityproject', page, None, clock) != etag, (
+        'ETag должен меняться не реже раза в `etag_ttl` секунд: запись '
+        'из другого процесса не увеличивает версию в этом.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_in_flight_read():
+    flight = SingleFlight('test_flight')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ('row',)
+
+    metrics.reset()
+    results = await asyncio.gather(*(
+        flight.do('key', fetch) for _ in range(5)
+    ))
+    assert results == [('row',)] * 5
+    assert len(calls) == 1, (
+        'Одновременные одинаковые чтения должны выполняться одним запросом.'
+    )
+    assert metrics.snapshot()['counters']['test_flight.shared'] == 4
+    await flight.do('key', fetch)
+    assert len(calls) == 2, (
+        'Завершившееся чтение не должно отдаваться последующим вызовам.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors():
+    flight = SingleFlight('test_flight')
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError('boom')
+
+    results = await asyncio.gather(
+        flight.do('key', fetch), flight.do('key', fetch),
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_leader_cancelled():
+    flight = SingleFlight('test_flight')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ('row',)
+
+    leader = asyncio.create_task(flight.do('key', fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do('key', fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await waiter == ('row',), (
+        'Отмена первого вызова не должна отменять ожидающих: они должны '
+        'повторить чтение сами.'
+    )
+    assert leader.cancelled()
+    assert len(calls) == 2
@@ -2,9 +2,12 @@ import time
 from datetime import datetime
 
 import pytest
+from conftest import allocation_state
 
 PROJECTS_URL = '/charity_project/'
 PROJECT_DETAILS_URL = PROJECTS_URL + '{project_id}'
+BATCH_PROJECTS_URL = PROJECTS_URL + 'batch'
+IMPORT_PROJECTS_URL = PROJECTS_URL + 'import'
 
 
 @pytest.mark.parametrize(
@@ -728,3 +731,80 @@ def test_get_all_charity_project_not_auth_user(test_client):
         f'пользователя к эндпоинту `{PROJECTS_URL}` возвращается список '
         'существующих проектов.'
     )
+
+
+BATCH_PROJECTS = [
+    {
+        'name': f'campaign {number}',
+        'description': 'batch',
+        'full_amount': amount,
+    }
+    for number, amount in enumerate((100, 100, 50), 1)
+]
+
+
+@pytest.mark.parametrize('batched', [True, False])
+def test_create_projects_batch_matches_sequential(
+    superuser_client, mixer, batched,
+):
+    for number, amount in enumerate((150, 60), 1):
+        mixer.blend(
+            'app.models.donation.Donation', user_id=1, full_amount=amount,
+            create_date=datetime(2011, 11, number),
+        )
+    if batched:
+        response = superuser_client.post(
+            BATCH_PROJECTS_URL, json=BATCH_PROJECTS,
+        )
+        assert response.status_code == 200, response.json()
+        assert response.headers['X-DB-Commits'] == '1', (
+            'Пачка проектов должна сохраняться одной транзакцией.'
+        )
+        assert [project['name'] for project in response.json()] == [
+            project['name'] for project in BATCH_PROJECTS
+        ]
+    else:
+        for project in BATCH_PROJECTS:
+            superuser_client.post(PROJECTS_URL, json=project)
+    assert allocation_state() == [
+        [(100, 1), (100, 1), (10, 0)],
+        [(150, 1), (60, 1)],
+    ], (
+        'Пачка проектов должна распределять пожертвования так же, как '
+        'последовательно созданные проекты.'
+    )
+
+
+def test_create_projects_batch_name_conflicts(
+    superuser_client, charity_project,
+):
+    response = superuser_client.post(
+        BATCH_PROJECTS_URL, json=[BATCH_PROJECTS[0], BATCH_PROJECTS[0]],
+    )
+    assert response.status_code == 400
+    response = superuser_client.post(BATCH_PROJECTS_URL, json=[
+        BATCH_PROJECTS[0], dict(BATCH_PROJECTS[1], name=charity_project.name),
+    ])
+    assert response.status_code == 400
+    assert charity_project.name in response.json()['detail']
+    assert len(superuser_client.get(PROJECTS_URL).json()) == 1, (
+        'При конфликте имён не должен создаваться ни один проект пачки.'
+    )
+
+
+def test_import_projects_csv(superuser_client):
+    content = 'name,description,full_amount\n' + ''.join(
+        f'{project["name"]},{project["description"]},'
+        f'{project["full_amount"]}\n'
+        for project in BATCH_PROJECTS
+    )
+    response = superuser_client.post(
+        IMPORT_PROJECTS_URL, files={'file': ('projects.csv', content)},
+    )
+    assert response.status_code == 200, response.json()
+    assert len(response.json()) == len(BATCH_PROJECTS)
+    response = superuser_client.post(IMPORT_PROJECTS_URL, files={
+        'file': ('projects.csv', content + 'broken,,-5\n'),
+    })
+    assert response.status_code == 422
+    assert {error['row'] for error in response.json()['detail']} == {4}
@@ -1,11 +1,21 @@
+import csv
+import io
+import json
 import time
 from datetime import datetime
 
 import pytest
+from conftest import allocation_state, app, current_user
+from fixtures.user import superuser
+
+from app.constants import DEFAULT_PAGE_SIZE, MAX_DONATION_BATCH_SIZE
 
 DONATIONS_URL = '/donation/'
 DONATON_DETAILS_URL = DONATIONS_URL + '{donation_id}'
 MY_DONATIONS_URL = DONATIONS_URL + 'my'
+STREAM_DONATIONS_URL = DONATIONS_URL + 'stream'
+EXPORT_DONATIONS_URL = DONATIONS_URL + 'export'
+BATCH_DONATIONS_URL = DONATIONS_URL + 'batch'
 
 
 @pytest.mark.parametrize('json_data, expected_keys, expected_data', [
@@ -221,3 +231,246 @@ def test_create_donation_check_create_date(user_client):
         'Убедитесь, что при неодновременном создании двух пожертвований '
         'у них отличаются значения в поле `create_date`.'
     )
+
+
+def test_get_all_donations_pagination(superuser_client, donation,
+                                      another_donation):
+    first_page = superuser_client.get(DONATIONS_URL, params={'limit': 1})
+    assert [item['id'] for item in first_page.json()] == [donation.id]
+    cursor = first_page.headers.get('X-Next-Cursor')
+    assert cursor, (
+        'Если у списка пожертвований есть следующая страница, в ответе '
+        'должен быть заголовок `X-Next-Cursor`.'
+    )
+    second_page = superuser_client.get(
+        DONATIONS_URL, params={'limit': 1, 'cursor': cursor},
+    )
+    assert [item['id'] for item in second_page.json()] == [
+        another_donation.id
+    ]
+    assert 'X-Next-Cursor' not in second_page.headers
+
+
+def test_get_all_donations_unpaginated_by_default(superuser_client, mixer):
+    mixer.cycle(DEFAULT_PAGE_SIZE + 1).blend(
+        'app.models.donation.Donation', full_amount=10, user_id=1,
+        create_date=datetime.now(),
+    )
+    response = superuser_client.get(DONATIONS_URL)
+    assert len(response.json()) == DEFAULT_PAGE_SIZE + 1, (
+        'Без `limit` и `cursor` список пожертвований должен возвращаться '
+        'целиком.'
+    )
+    assert 'X-Next-Cursor' not in response.headers
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'e30', 'eyJpZCI6ICIxIn0'])
+def test_get_all_donations_invalid_cursor(superuser_client, cursor):
+    response = superuser_client.get(DONATIONS_URL, params={'cursor': cursor})
+    assert response.status_code == 422, (
+        f'GET-запрос к эндпоинту `{DONATIONS_URL}` с некорректным курсором '
+        'должен вернуть ответ со статус-кодом 422.'
+    )
+
+
+def test_stream_all_donations(superuser_client, donation, another_donation):
+    expected = superuser_client.get(DONATIONS_URL).json()
+    response = superuser_client.get(STREAM_DONATIONS_URL)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert [json.loads(line) for line in response.text.splitlines()] == (
+        expected
+    ), (
+        f'NDJSON-выгрузка `{STREAM_DONATIONS_URL}` должна содержать те же '
+        'пожертвования, что и список.'
+    )
+    response = superuser_client.get(
+        STREAM_DONATIONS_URL, params={'format': 'json'},
+    )
+    assert response.json() == expected, (
+        f'JSON-выгрузка `{STREAM_DONATIONS_URL}` должна содержать те же '
+        'пожертвования, что и список.'
+    )
+
+
+def test_stream_donations_forbidden(user_client):
+    response = user_client.get(STREAM_DONATIONS_URL)
+    assert response.status_code == 403, (
+        f'Выгрузка `{STREAM_DONATIONS_URL}` доступна только '
+        'суперпользователю.'
+    )
+
+
+def test_export_donations_csv(superuser_client, donation, another_donation):
+    response = superuser_client.get(EXPORT_DONATIONS_URL)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row['id']) for row in rows] == [
+        donation.id, another_donation.id,
+    ]
+    response = superuser_client.get(
+        EXPORT_DONATIONS_URL,
+        params={'create_date_from': '2012-01-01T00:00:00'},
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row['id']) for row in rows] == [another_donation.id], (
+        f'Выгрузка `{EXPORT_DONATIONS_URL}` должна учитывать фильтр по '
+        'дате создания.'
+    )
+
+
+@pytest.mark.parametrize('params, expected', [
+    ({'create_date_from': '2012-12-12'}, ['another_donation']),
+    ({'create_date_to': '2011-11-11'}, ['donation']),
+    ({'create_date_to': '2011-11-11T00:00:00'}, []),
+])
+def test_export_donations_date_filters(superuser_client, donation,
+                                       another_donation, params, expected):
+    donations = {
+        'donation': donation.id, 'another_donation': another_donation.id,
+    }
+    response = superuser_client.get(EXPORT_DONATIONS_URL, params=params)
+    assert response.status_code == 200, (
+        'Фильтры выгрузки должны принимать и дату, и дату со временем.'
+    )
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row['id']) for row in rows] == [
+        donations[name] for name in expected
+    ], 'Дата в `*_to` должна включать весь указанный день.'
+
+
+def test_export_donations_csv_formulas(superuser_client, mixer):
+    mixer.blend(
+        'app.models.donation.Donation', full_amount=10, user_id=1,
+        comment='=HYPERLINK("http://evil.example")',
+        create_date=datetime.now(),
+    )
+    response = superuser_client.get(EXPORT_DONATIONS_URL)
+    row, = csv.DictReader(io.StringIO(response.text))
+    assert row['comment'] == '\'=HYPERLINK("http://evil.example")', (
+        'Ячейки CSV, начинающиеся с `=`, `+`, `-` или `@`, должны '
+        'экранироваться, чтобы редактор таблиц не выполнил формулу.'
+    )
+
+
+def test_export_donations_parquet(superuser_client, donation,
+                                  another_donation):
+    pq = pytest.importorskip('pyarrow.parquet')
+    response = superuser_client.get(
+        EXPORT_DONATIONS_URL, params={'format': 'parquet'},
+    )
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column('full_amount').to_pylist() == [
+        donation.full_amount, another_donation.full_amount,
+    ]
+
+
+def test_get_all_donations_fields(superuser_client, donation,
+                                  another_donation):
+    response = superuser_client.get(
+        DONATIONS_URL, params={'fields': 'id,full_amount', 'limit': 1},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {'id': donation.id, 'full_amount': donation.full_amount},
+    ], (
+        f'GET-запрос к эндпоинту `{DONATIONS_URL}` с параметром `fields` '
+        'должен возвращать только выбранные поля.'
+    )
+    assert 'X-Next-Cursor' in response.headers
+
+
+@pytest.mark.parametrize('fields', ['password', ',', 'id,user'])
+def test_get_my_donations_unknown_fields(user_client, fields):
+    response = user_client.get(MY_DONATIONS_URL, params={'fields': fields})
+    assert response.status_code == 422, (
+        f'GET-запрос к эндпоинту `{MY_DONATIONS_URL}` с неизвестным полем в '
+        '`fields` должен вернуть ответ со статус-кодом 422.'
+    )
+
+
+def batch_projects(mixer):
+    for number, full_amount in enumerate((100, 1000), 1):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'batch {number}',
+            description='batch',
+            full_amount=full_amount,
+            create_date=datetime(2010, 10, number),
+        )
+
+
+@pytest.mark.parametrize('batched', [True, False])
+def test_donation_batch_matches_sequential(user_client, mixer, batched):
+    batch_projects(mixer)
+    amounts = [50, 80, 2000, 30]
+    if batched:
+        response = user_client.post(BATCH_DONATIONS_URL, json=[
+            {'full_amount': amount} for amount in amounts
+        ])
+        assert response.status_code == 200, response.json()
+        assert response.headers['X-DB-Commits'] == '1', (
+            'Пачка пожертвований должна сохраняться одной транзакцией.'
+        )
+        data = response.json()
+        assert [item['full_amount'] for item in data] == amounts
+        assert {item['user_id'] for item in data} == {2}
+    else:
+        for amount in amounts:
+            user_client.post(DONATIONS_URL, json={'full_amount': amount})
+    assert allocation_state() == [
+        [(100, 1), (1000, 1)],
+        [(50, 1), (80, 1), (970, 0), (0, 0)],
+    ], (
+        'Пачка пожертвований должна распределяться так же, как '
+        'последовательно созданные пожертвования.'
+    )
+
+
+def test_donation_batch_bulk_insert(user_client):
+    response = user_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': amount} for amount in range(1, 51)
+    ])
+    assert response.status_code == 200, response.json()
+    assert [item['full_amount'] for item in response.json()] == list(
+        range(1, 51)
+    )
+    assert len({item['id'] for item in response.json()}) == 50
+    assert int(response.headers['X-DB-Statements']) <= 5, (
+        'Пачка пожертвований должна вставляться одной executemany-вставкой, '
+        'а не отдельным INSERT на каждое пожертвование.'
+    )
+
+
+def test_donation_batch_on_behalf_forbidden(user_client):
+    response = user_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': 10, 'user_id': 1},
+    ])
+    assert response.status_code == 403
+
+
+def test_donation_batch_on_behalf(superuser_client, mixer):
+    app.dependency_overrides[current_user] = lambda: superuser
+    mixer.blend(
+        'app.models.user.User', id=2, email='dead@pool.com',
+        hashed_password='-',
+    )
+    response = superuser_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': 10, 'user_id': 2},
+        {'full_amount': 20},
+    ])
+    assert response.status_code == 200, response.json()
+    assert [item['user_id'] for item in response.json()] == [2, 1]
+    response = superuser_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': 10, 'user_id': 404},
+    ])
+    assert response.status_code == 404
+
+
+def test_donation_batch_limits(user_client):
+    assert user_client.post(BATCH_DONATIONS_URL, json=[]).status_code == 422
+    assert user_client.post(BATCH_DONATIONS_URL, json=[
+        {'full_amount': 1},
+    ] * (MAX_DONATION_BATCH_SIZE + 1)).status_code == 422
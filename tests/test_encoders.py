@@ -0,0 +1,40 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.api.utils import rows_response
+from app.core.config import settings
+from app.core.encoders import FastJSONResponse, dumps
+
+
+@pytest.mark.parametrize('value', [
+    datetime(2011, 11, 11),
+    datetime(2011, 11, 11, 10, 30, 15, 123456),
+    datetime(2011, 11, 11, 10, 30, tzinfo=timezone(timedelta(hours=3))),
+])
+def test_dumps_datetime_like_jsonable_encoder(value):
+    content = [{'id': 1, 'name': 'Кот', 'create_date': value, 'close': None}]
+    assert json.loads(dumps(content)) == jsonable_encoder(content), (
+        'Быстрый путь кодирования должен выдавать те же даты, что и '
+        '`jsonable_encoder`.'
+    )
+
+
+@pytest.mark.parametrize('fast', [True, False])
+def test_rows_response_follows_setting(monkeypatch, fast):
+    monkeypatch.setattr(settings, 'fast_json_responses', fast)
+    rows = [SimpleNamespace(id=1, create_date=datetime(2011, 11, 11))]
+    response = rows_response(
+        rows, ('id', 'create_date'), Response(headers={'X-Test': '1'}),
+    )
+    assert isinstance(response, FastJSONResponse) is fast, (
+        '`FAST_JSON_RESPONSES` должен переключать класс ответа списков.'
+    )
+    assert json.loads(response.body) == [
+        {'id': 1, 'create_date': '2011-11-11T00:00:00'},
+    ]
+    assert response.headers['X-Test'] == '1'
@@ -60,3 +60,28 @@ def test_donation_to_little_invest_project(
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+@pytest.mark.usefixtures('charity_project', 'charity_project_nunchaku')
+def test_donation_single_commit(user_client):
+    response = user_client.post(DONATION_URL, json={'full_amount': 1500000})
+    assert response.status_code == 200
+    assert response.headers['X-DB-Commits'] == '1', (
+        'Создание пожертвования вместе с распределением средств '
+        'должно выполняться в одной транзакции с одним commit.'
+    )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_project_create_single_commit(superuser_client):
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1000,
+    })
+    assert response.status_code == 200
+    assert response.headers['X-DB-Commits'] == '1', (
+        'Создание проекта вместе с распределением средств '
+        'должно выполняться в одной транзакции с одним commit.'
+    )
+    assert response.json()['fully_invested']
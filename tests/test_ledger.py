@@ -0,0 +1,68 @@
+import pytest
+
+DONATION_URL = '/donation/'
+PROJECTS_URL = '/charity_project/'
+PROJECT_INVESTMENTS_URL = PROJECTS_URL + '{project_id}/investments'
+DONATION_INVESTMENTS_URL = DONATION_URL + '{donation_id}/investments'
+
+
+def test_donation_investments(user_client, charity_project,
+                              charity_project_nunchaku):
+    response = user_client.post(DONATION_URL, json={'full_amount': 1500000})
+    donation_id = response.json()['id']
+    response = user_client.get(
+        DONATION_INVESTMENTS_URL.format(donation_id=donation_id)
+    )
+    assert response.status_code == 200
+    data = [
+        (item['charity_project_id'], item['amount'])
+        for item in response.json()
+    ]
+    assert data == [
+        (charity_project.id, 1000000),
+        (charity_project_nunchaku.id, 500000),
+    ], (
+        'Журнал вложений должен показывать, в какие проекты и в каком '
+        'размере ушло пожертвование.'
+    )
+
+
+@pytest.mark.usefixtures('donation', 'another_donation')
+def test_project_investments_pagination(superuser_client):
+    response = superuser_client.post(PROJECTS_URL, json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 1000,
+    })
+    url = PROJECT_INVESTMENTS_URL.format(project_id=response.json()['id'])
+    first_page = superuser_client.get(url, params={'limit': 1})
+    assert [item['amount'] for item in first_page.json()] == [100]
+    second_page = superuser_client.get(url, params={
+        'limit': 1, 'cursor': first_page.headers['X-Next-Cursor'],
+    })
+    assert [item['amount'] for item in second_page.json()] == [900], (
+        'Журнал вложений проекта должен постранично возвращать '
+        'пожертвования в порядке FIFO.'
+    )
+    assert 'X-Next-Cursor' not in second_page.headers
+
+
+@pytest.mark.parametrize('client', ['test_client', 'user_client'])
+def test_project_investments_superuser_only(request, client,
+                                            charity_project):
+    response = request.getfixturevalue(client).get(
+        PROJECT_INVESTMENTS_URL.format(project_id=charity_project.id)
+    )
+    assert response.status_code in (401, 403), (
+        'Журнал вложений проекта раскрывает чужие пожертвования и должен '
+        'быть доступен только суперпользователю.'
+    )
+
+
+def test_foreign_donation_investments(user_client, another_donation):
+    response = user_client.get(
+        DONATION_INVESTMENTS_URL.format(donation_id=another_donation.id)
+    )
+    assert response.status_code == 404, (
+        'Пользователь не должен видеть распределение чужих пожертвований.'
+    )
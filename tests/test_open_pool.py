@@ -0,0 +1,91 @@
+import pytest
+import pytest_asyncio
+from conftest import TestingSessionLocal
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from app.core.db import Base
+from app.crud.base import OPEN_POOL_COLUMNS, CRUDBase
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate
+from app.services.open_pool import open_pool_index
+
+
+@pytest_asyncio.fixture
+async def warm_index():
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name=f'project {number}', description='FIFO',
+                full_amount=100,
+            )
+            for number in range(3)
+        ])
+        session.add(Donation(user_id=1, full_amount=30))
+        await session.commit()
+        await open_pool_index.warm(session)
+    yield open_pool_index
+    open_pool_index.ready = False
+
+
+@pytest.mark.asyncio
+async def test_open_pool_index_warm(warm_index):
+    assert len(warm_index.side(CharityProject)) == 3
+    assert len(warm_index.side(Donation)) == 1, (
+        'Индекс открытого пула должен содержать все открытые записи.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_open_pool_index_consistent_after_allocation(warm_index):
+    async with TestingSessionLocal() as session:
+        donation = await donation_crud.create_and_process_donation(
+            DonationCreate(full_amount=150), session, User(id=2),
+        )
+    assert donation.fully_invested
+    assert len(warm_index.side(CharityProject)) == 2, (
+        'Закрытые распределением проекты должны удаляться из индекса.'
+    )
+    async with TestingSessionLocal() as session:
+        report = await warm_index.verify(session)
+    for table in ('charityproject', 'donation'):
+        assert report[table] == {'missing': [], 'extra': [], 'stale': []}, (
+            'После распределения индекс открытого пула должен совпадать '
+            'с базой данных.'
+        )
+
+
+@pytest.mark.parametrize('single_process, serialized, enabled', [
+    (False, True, False),
+    (True, False, False),
+    (True, True, True),
+])
+def test_open_pool_index_requires_single_process(
+    monkeypatch, single_process, serialized, enabled,
+):
+    monkeypatch.setattr(settings, 'open_pool_index', True)
+    monkeypatch.setattr(settings, 'single_process', single_process)
+    monkeypatch.setattr(settings, 'allocation_serialized', serialized)
+    assert open_pool_index.enabled is enabled, (
+        'Индекс включается только в одном процессе '
+        'с последовательным распределением.'
+    )
+
+
+@pytest.mark.parametrize('model', [CharityProject, Donation])
+def test_open_pool_query_uses_covering_index(model):
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        query = CRUDBase(model).fifo_query(
+            OPEN_POOL_COLUMNS, model.fully_invested == False,  # noqa
+        ).compile(dialect=conn.dialect)
+        params = query.construct_params()
+        plan = conn.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {query}',
+            tuple(params[key] for key in query.positiontup),
+        ).all()
+    assert f'COVERING INDEX ix_{model.__tablename__}_open_fifo' in (
+        plan[0][-1]
+    ), 'Запрос открытого пула должен читаться только из частичного индекса.'
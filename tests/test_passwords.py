@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from fastapi_users.password import PasswordHelper
+
+from app.core.password import PasswordPool
+
+PASSWORD = 'chimichangas4life'
+
+
+@pytest.mark.asyncio
+async def test_password_pool_hashes_off_event_loop():
+    pool = PasswordPool(rounds=4, concurrency=2, queue_size=0)
+    try:
+        thread_name = await pool._run(
+            lambda: threading.current_thread().name
+        )
+        assert thread_name.startswith('password'), (
+            'Хэширование пароля должно выполняться вне цикла событий.'
+        )
+        hashed = await pool.hash(PASSWORD)
+        assert await pool.verify_and_update(PASSWORD, hashed) == (
+            True, None,
+        )
+        verified, _ = await pool.verify_and_update('nunchaku', hashed)
+        assert not verified
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_over_queue_limit():
+    pool = PasswordPool(rounds=4, concurrency=1, queue_size=1)
+    try:
+        results = await asyncio.gather(
+            *(pool.hash(PASSWORD) for _ in range(3)),
+            return_exceptions=True,
+        )
+    finally:
+        pool.shutdown()
+    rejected = [
+        result for result in results if isinstance(result, HTTPException)
+    ]
+    assert len(rejected) == 1, (
+        'Вызовы сверх очереди пула должны отклоняться.'
+    )
+    assert rejected[0].status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_password_pool_inline_without_concurrency():
+    pool = PasswordPool(rounds=4, concurrency=0, queue_size=0)
+    thread_name = await pool._run(lambda: threading.current_thread().name)
+    assert thread_name == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_pooled_helper_serves_prepared_results(monkeypatch):
+    threads = []
+    original_hash = PasswordHelper.hash
+
+    def spy_hash(self, password):
+        threads.append(threading.current_thread().name)
+        return original_hash(self, password)
+
+    monkeypatch.setattr(PasswordHelper, 'hash', spy_hash)
+    pool = PasswordPool(rounds=4, concurrency=1, queue_size=0)
+    try:
+        async with pool.helper.prepared(PASSWORD):
+            hashed = pool.helper.hash(PASSWORD)
+        async with pool.helper.prepared(PASSWORD, hashed):
+            assert pool.helper.verify_and_update(PASSWORD, hashed) == (
+                True, None,
+            )
+    finally:
+        pool.shutdown()
+    assert len(threads) == 1 and threads[0].startswith('password'), (
+        'Внутри `prepared` helper должен отдавать хэш, посчитанный в пуле, '
+        'а не считать его в цикле событий.'
+    )
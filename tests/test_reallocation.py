@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.models import CharityProject, Donation, Investment
+from app.services.reallocation import Replay
+
+
+async def create_broken_data():
+    async with TestingSessionLocal() as session:
+        session.add_all([
+            CharityProject(
+                name='chimichangas4life', description='Chimichangas',
+                full_amount=100, invested_amount=0,
+                create_date=datetime(2010, 10, 10),
+            ),
+            Donation(
+                user_id=1, full_amount=60, invested_amount=60,
+                fully_invested=True, close_date=datetime(2011, 1, 1),
+                create_date=datetime(2011, 1, 1),
+            ),
+            Donation(
+                user_id=2, full_amount=70, invested_amount=0,
+                create_date=datetime(2012, 1, 1),
+            ),
+            CharityProject(
+                name='nunchaku', description='Nunchaku is better',
+                full_amount=500, invested_amount=0,
+                create_date=datetime(2013, 1, 1),
+            ),
+        ])
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_reallocation_dry_run():
+    await create_broken_data()
+    async with TestingSessionLocal() as session:
+        report = await Replay(session, dry_run=True, chunk_size=1).run()
+        await session.commit()
+        projects = (await session.execute(
+            select(CharityProject.invested_amount)
+        )).scalars().all()
+    assert report.rows == 4
+    assert report.changed == 3, (
+        'Пробный прогон должен находить все расхождения с пересчётом.'
+    )
+    assert projects == [0, 0], 'Пробный прогон не должен менять данные.'
+
+
+@pytest.mark.asyncio
+async def test_reallocation_rebuild():
+    await create_broken_data()
+    async with TestingSessionLocal() as session:
+        await Replay(session, chunk_size=1).run()
+        await session.commit()
+    async with TestingSessionLocal() as session:
+        projects = (await session.execute(
+            select(CharityProject).order_by(CharityProject.id)
+        )).scalars().all()
+        donations = (await session.execute(
+            select(Donation).order_by(Donation.id)
+        )).scalars().all()
+        ledger = (await session.execute(
+            select(Investment.amount).order_by(Investment.id)
+        )).scalars().all()
+    assert [
+        (project.invested_amount, project.fully_invested)
+        for project in projects
+    ] == [(100, True), (30, False)], (
+        'Пересчёт должен распределять средства в порядке FIFO.'
+    )
+    assert [donation.invested_amount for donation in donations] == [60, 70]
+    assert all(donation.fully_invested for donation in donations)
+    assert donations[0].close_date == datetime(2011, 1, 1), (
+        'У уже закрытых записей пересчёт не должен менять `close_date`.'
+    )
+    assert ledger == [60, 40, 30], (
+        'Пересчёт должен заново построить журнал вложений.'
+    )
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import create_engine, func, select
+
+from app.core.config import settings
+from app.core.db import Base
+from app.models import User
+from app.services import user_import
+from app.services.user_import import (
+    ImportFormat, UserImport, import_users_in_processes, read_records,
+)
+
+IMPORT_URL = '/users/import'
+LOGIN_URL = '/auth/jwt/login'
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setattr(settings, 'password_hash_rounds', 4)
+    monkeypatch.setattr(settings, 'user_import_workers', 2)
+
+
+def test_import_users_csv(superuser_client):
+    superuser_client.post('/auth/register', json={
+        'email': 'existing@pool.com', 'password': 'chimichangas4life',
+    })
+    content = (
+        'email,password,is_superuser\n'
+        'dead@pool.com,chimichangas4life,\n'
+        'EXISTING@pool.com,chimichangas4life,\n'
+        'not-an-email,chimichangas4life,\n'
+        'short@pool.com,$,\n'
+        'Dead@pool.com,nunchaku4life,\n'
+        'admin@pool.com,nunchaku4life,true\n'
+    )
+    response = superuser_client.post(
+        IMPORT_URL, files={'file': ('users.csv', content, 'text/csv')},
+    )
+    assert response.status_code == 200, response.json()
+    report = response.json()
+    assert {key: report[key] for key in (
+        'rows', 'created', 'skipped', 'failed',
+    )} == {'rows': 6, 'created': 2, 'skipped': 1, 'failed': 3}, (
+        'Отчёт импорта должен учитывать созданных, пропущенных '
+        'и ошибочные строки.'
+    )
+    assert [error['row'] for error in report['errors']] == [3, 4, 5]
+    login = superuser_client.post(LOGIN_URL, data={
+        'username': 'admin@pool.com', 'password': 'nunchaku4life',
+    })
+    assert login.status_code == 200, (
+        'Импортированный пользователь должен входить со своим паролем.'
+    )
+
+
+def test_import_users_ndjson(superuser_client):
+    content = '\n'.join((
+        json.dumps({'email': 'dead@pool.com', 'password': 'x' * 8}),
+        '{broken',
+        '',
+        json.dumps(['not', 'an', 'object']),
+    ))
+    response = superuser_client.post(
+        IMPORT_URL, params={'format': 'ndjson'},
+        files={'file': ('users.ndjson', content)},
+    )
+    report = response.json()
+    assert (report['created'], report['failed']) == (1, 2)
+    response = superuser_client.post(
+        IMPORT_URL, params={'format': 'ndjson'},
+        files={'file': ('users.ndjson', content)},
+    )
+    assert (response.json()['created'], response.json()['skipped']) == (0, 1)
+
+
+def test_import_users_forbidden(user_client):
+    response = user_client.post(
+        IMPORT_URL, files={'file': ('users.csv', 'email,password\n')},
+    )
+    assert response.status_code == 403
+
+
+def test_import_users_not_utf8(superuser_client):
+    response = superuser_client.post(
+        IMPORT_URL,
+        files={'file': ('users.csv', 'email,password\n'.encode('utf-16'))},
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_import_users_in_processes():
+    lines = ['email,password', 'dead@pool.com,chimichangas4life']
+    async with TestingSessionLocal() as session:
+        report = await import_users_in_processes(
+            session, read_records(lines, ImportFormat.csv), workers=2,
+        )
+    assert (report.created, report.failed) == (1, 0), (
+        'Скрипт импорта должен хэшировать пароли в пуле процессов.'
+    )
+
+
+@pytest.mark.asyncio
+async def test_import_users_conflict_without_upsert(monkeypatch):
+    async def no_existing(self, emails):
+        return set()
+
+    monkeypatch.setattr(user_import, 'UPSERT_DIALECTS', {})
+    monkeypatch.setattr(UserImport, 'existing_emails', no_existing)
+    lines = ['email,password', 'dead@pool.com,chimichangas4life']
+    async with TestingSessionLocal() as session:
+        await user_import.import_users(
+            session, read_records(lines, ImportFormat.csv),
+        )
+        lines.append('nunchaku@pool.com,nunchaku4life')
+        report = await user_import.import_users(
+            session, read_records(lines, ImportFormat.csv),
+        )
+        users = (await session.execute(select(func.count(User.id)))).scalar()
+    assert (report.created, report.skipped) == (1, 1), (
+        'Без ON CONFLICT конфликт одной строки не должен отменять '
+        'вставку остальных строк пачки.'
+    )
+    assert users == 2
+
+
+def test_existing_emails_lookup_uses_index():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        query = select(func.lower(User.email)).where(
+            func.lower(User.email).in_(['dead@pool.com', 'nunchaku@pool.com'])
+        ).compile(
+            dialect=conn.dialect, compile_kwargs={'literal_binds': True},
+        )
+        plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {query}').all()
+    assert 'SEARCH user USING INDEX ix_user_email_lower' in plan[0][-1], (
+        'Отсев существующих email должен искать по индексу lower(email), '
+        'а не просматривать весь индекс пользователей.'
+    )